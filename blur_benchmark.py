@@ -0,0 +1,57 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2011 ~ 2012 Deepin, Inc.
+#               2011 ~ 2012 Wang Yong
+# 
+# Author:     Wang Yong <lazycat.manatee@gmail.com>
+# Maintainer: Wang Yong <lazycat.manatee@gmail.com>
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import cairo
+import dtk_cairo_blur
+import sys
+import time
+
+def blur_time(mode, radius, width, height, repeat, thread_num=None):
+    '''Get average time of blur surface with given mode, use native threads if thread_num is not None.'''
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+    cr = cairo.Context(surface)
+    cr.set_source_rgba(1, 1, 1, 1)
+    cr.rectangle(width / 4, height / 4, width / 2, height / 2)
+    cr.fill()
+    
+    start_time = time.time()
+    for _ in range(repeat):
+        if thread_num == None:
+            dtk_cairo_blur.gaussian_blur(surface, radius, mode)
+        else:
+            dtk_cairo_blur.gaussian_blur_threads(surface, radius, thread_num, mode)
+    return (time.time() - start_time) / repeat
+
+if __name__ == "__main__":
+    (width, height) = (400, 300)
+    repeat = 5
+    if len(sys.argv) == 3:
+        (width, height) = (int(sys.argv[1]), int(sys.argv[2]))
+    
+    print "Blur %sx%s surface, average of %s runs:" % (width, height, repeat)
+    print "%6s %12s %12s %8s %14s" % ("radius", "kernel (ms)", "box (ms)", "speedup", "threads (ms)")
+    for radius in range(1, 21):
+        kernel_time = blur_time(dtk_cairo_blur.BLUR_MODE_KERNEL, radius, width, height, repeat)
+        box_time = blur_time(dtk_cairo_blur.BLUR_MODE_BOX, radius, width, height, repeat)
+        threads_time = blur_time(dtk_cairo_blur.BLUR_MODE_BOX, radius, width, height, repeat, 0)
+        print "%6s %12.2f %12.2f %7.1fx %14.2f" % (
+            radius, kernel_time * 1000, box_time * 1000, kernel_time / box_time, threads_time * 1000)
@@ -23,7 +23,7 @@
 from mplayer_window import MplayerWindow
 from skin import SkinWindow
 from skin_config import skin_config
-from threads import post_gui
+from threads import post_main_loop
 from titlebar import Titlebar
 from utils import container_remove_all, place_center
 from window import Window
@@ -100,7 +100,7 @@ class Application(object):
         '''Hide titlebar.'''
         container_remove_all(self.titlebar_box)
 
-    @post_gui
+    @post_main_loop
     def raise_to_top(self):
         '''Raise to top.'''
         self.window.present()
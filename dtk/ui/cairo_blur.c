@@ -29,13 +29,30 @@
 #include <stdint.h>
 #include <memory.h>
 #include <stdio.h>
+#include <pthread.h>
+#include <unistd.h>
+
+/* Blur modes of gaussian_blur. */
+#define BLUR_MODE_KERNEL 0      /* exact gaussian kernel */
+#define BLUR_MODE_BOX 1         /* triple box blur approximation */
+
+#define BOX_BLUR_PASSES 3
+#define BLUR_MAX_THREADS 16
+#define BLUR_MIN_THREAD_PIXELS (128 * 128) /* don't split smaller surfaces */
 
 static void blur_image_surface (cairo_surface_t *surface, double radius);
+static void box_blur_image_surface (cairo_surface_t *surface, double sigma);
+static void box_blur_image_surface_threads (cairo_surface_t *surface, double sigma, int thread_num);
 static PyObject* dtk_cairo_blur_gaussian_blur(PyObject* self, PyObject* args);
+static PyObject* dtk_cairo_blur_gaussian_blur_threads(PyObject* self, PyObject* args);
 
 static PyMethodDef cairo_blur_methods[] = {
      {"gaussian_blur", dtk_cairo_blur_gaussian_blur, METH_VARARGS,
-      "Perform a gaussian blur of the specified radius on a cairo surface"},
+      "Perform a gaussian blur of the specified radius on a cairo surface, "
+      "optional mode is BLUR_MODE_KERNEL (default) or BLUR_MODE_BOX"},
+     {"gaussian_blur_threads", dtk_cairo_blur_gaussian_blur_threads, METH_VARARGS,
+      "Perform a gaussian blur on a cairo surface with thread_num native threads (0 is cpu count), "
+      "GIL is released during blur, optional mode is BLUR_MODE_BOX (default) or BLUR_MODE_KERNEL"},
      {NULL, NULL, 0, NULL}
 };
 
@@ -54,6 +71,11 @@ static inline int _pos_to_index (int x, int y, int width, int height);
 static inline struct _pixel _num_to_pixel_with_factor (guint32 value, int factor);
 static inline guint32 _pixel_to_num_with_divisor (struct _pixel *pixel, int divisor);
 static inline void _pixel_plus (struct _pixel *adder_sum, const struct _pixel *adder2);
+static void _calc_box_sizes (double sigma, int *sizes, int n);
+static void _box_blur_rows (const guint32 *src, guint32 *dst, int width, int stride,
+                            int y_start, int y_end, int radius);
+static void _box_blur_columns (const guint32 *src, guint32 *dst, guint32 *sums, int width, int height,
+                               int stride, int x_start, int x_end, int radius);
 
 PyMODINIT_FUNC initdtk_cairo_blur(void) {
      PyObject *m;
@@ -66,18 +88,48 @@ PyMODINIT_FUNC initdtk_cairo_blur(void) {
      if (!m) {
           return;
      }
+     
+     PyModule_AddIntConstant(m, "BLUR_MODE_KERNEL", BLUR_MODE_KERNEL);
+     PyModule_AddIntConstant(m, "BLUR_MODE_BOX", BLUR_MODE_BOX);
 }
 
 
 static PyObject* dtk_cairo_blur_gaussian_blur(PyObject* self, PyObject* args) {
      PycairoSurface* surface = NULL;
      double radius = 0;
+     int mode = BLUR_MODE_KERNEL;
+
+     if (!PyArg_ParseTuple(args, "Od|i", &surface, &radius, &mode)) {
+          return NULL;
+     }
+
+     if (mode == BLUR_MODE_BOX) {
+          box_blur_image_surface(surface->surface, radius);
+     } else {
+          blur_image_surface(surface->surface, radius);
+     }
+
+     Py_RETURN_NONE;
+}
+
+static PyObject* dtk_cairo_blur_gaussian_blur_threads(PyObject* self, PyObject* args) {
+     PycairoSurface* surface = NULL;
+     double radius = 0;
+     int thread_num = 0;
+     int mode = BLUR_MODE_BOX;
 
-     if (!PyArg_ParseTuple(args, "Od", &surface, &radius)) {
+     if (!PyArg_ParseTuple(args, "Od|ii", &surface, &radius, &thread_num, &mode)) {
           return NULL;
      }
 
-     blur_image_surface(surface->surface, radius);
+     /* Surface is kept alive by caller's reference, so it's safe to release GIL. */
+     Py_BEGIN_ALLOW_THREADS
+     if (mode == BLUR_MODE_BOX) {
+          box_blur_image_surface_threads(surface->surface, radius, thread_num);
+     } else {
+          blur_image_surface(surface->surface, radius);
+     }
+     Py_END_ALLOW_THREADS
 
      Py_RETURN_NONE;
 }
@@ -190,3 +242,360 @@ static void blur_image_surface (cairo_surface_t *surface, double sigma) {
      _apply_kernel (surface, kernel, kernel_size);
      g_free (kernel);
 }
+
+/* Calculate box sizes of n box blur passes that approximate gaussian blur of sigma. */
+static void
+_calc_box_sizes (double sigma, int *sizes, int n) {
+     double w_ideal = sqrt (12.0 * sigma * sigma / n + 1.0);
+     int wl = floor (w_ideal);
+     if (wl % 2 == 0)
+          wl--;
+     int wu = wl + 2;
+     double m_ideal = (12.0 * sigma * sigma - n * wl * wl - 4.0 * n * wl - 3.0 * n) / (-4.0 * wl - 4.0);
+     int m = round (m_ideal);
+     int i;
+     for (i = 0; i < n; i++)
+          sizes[i] = i < m ? wl : wu;
+}
+
+/* Horizontal box blur of rows [y_start, y_end) with running sum, 
+ * pixels out of image are skipped like _apply_kernel does. */
+static void
+_box_blur_rows (const guint32 *src, guint32 *dst, int width, int stride,
+                int y_start, int y_end, int radius) {
+     int x, y;
+     for (y = y_start; y < y_end; y++)
+     {
+          const guint32 *row = src + y * stride;
+          guint32 *out = dst + y * stride;
+          guint32 a = 0, r = 0, g = 0, b = 0;
+          int count = 0;
+          
+          for (x = 0; x < radius && x < width; x++)
+          {
+               a += row[x] >> 24; r += (row[x] >> 16) & 0xff;
+               g += (row[x] >> 8) & 0xff; b += row[x] & 0xff;
+               count++;
+          }
+          
+          for (x = 0; x < width; x++)
+          {
+               if (x + radius < width)
+               {
+                    guint32 p = row[x + radius];
+                    a += p >> 24; r += (p >> 16) & 0xff; g += (p >> 8) & 0xff; b += p & 0xff;
+                    count++;
+               }
+               if (x - radius - 1 >= 0)
+               {
+                    guint32 p = row[x - radius - 1];
+                    a -= p >> 24; r -= (p >> 16) & 0xff; g -= (p >> 8) & 0xff; b -= p & 0xff;
+                    count--;
+               }
+               out[x] = (((a + count / 2) / count) << 24) | (((r + count / 2) / count) << 16)
+                    | (((g + count / 2) / count) << 8) | ((b + count / 2) / count);
+          }
+     }
+}
+
+/* Vertical box blur of columns [x_start, x_end) with running sum per column.
+ * Walk image row by row to keep memory access cache-friendly, 
+ * sums need 4 * width elements. */
+static void
+_box_blur_columns (const guint32 *src, guint32 *dst, guint32 *sums, int width, int height,
+                   int stride, int x_start, int x_end, int radius) {
+     guint32 *sum_a = sums;
+     guint32 *sum_r = sums + width;
+     guint32 *sum_g = sums + width * 2;
+     guint32 *sum_b = sums + width * 3;
+     int count = 0;
+     int x, y;
+     
+     for (x = x_start; x < x_end; x++)
+          sum_a[x] = sum_r[x] = sum_g[x] = sum_b[x] = 0;
+     
+     for (y = 0; y < radius && y < height; y++)
+     {
+          const guint32 *row = src + y * stride;
+          for (x = x_start; x < x_end; x++)
+          {
+               sum_a[x] += row[x] >> 24; sum_r[x] += (row[x] >> 16) & 0xff;
+               sum_g[x] += (row[x] >> 8) & 0xff; sum_b[x] += row[x] & 0xff;
+          }
+          count++;
+     }
+     
+     for (y = 0; y < height; y++)
+     {
+          if (y + radius < height)
+          {
+               const guint32 *row = src + (y + radius) * stride;
+               for (x = x_start; x < x_end; x++)
+               {
+                    sum_a[x] += row[x] >> 24; sum_r[x] += (row[x] >> 16) & 0xff;
+                    sum_g[x] += (row[x] >> 8) & 0xff; sum_b[x] += row[x] & 0xff;
+               }
+               count++;
+          }
+          if (y - radius - 1 >= 0)
+          {
+               const guint32 *row = src + (y - radius - 1) * stride;
+               for (x = x_start; x < x_end; x++)
+               {
+                    sum_a[x] -= row[x] >> 24; sum_r[x] -= (row[x] >> 16) & 0xff;
+                    sum_g[x] -= (row[x] >> 8) & 0xff; sum_b[x] -= row[x] & 0xff;
+               }
+               count--;
+          }
+          
+          guint32 *out = dst + y * stride;
+          int half = count / 2;
+          for (x = x_start; x < x_end; x++)
+               out[x] = (((sum_a[x] + half) / count) << 24) | (((sum_r[x] + half) / count) << 16)
+                    | (((sum_g[x] + half) / count) << 8) | ((sum_b[x] + half) / count);
+     }
+}
+
+static void box_blur_image_surface (cairo_surface_t *surface, double sigma) {
+     int sizes[BOX_BLUR_PASSES];
+     int width, height, stride, i;
+     guint32 *pixels, *scratch, *sums;
+     
+     if (sigma <= 0)
+          return;
+     
+     cairo_surface_flush (surface);
+     pixels = (guint32*) cairo_image_surface_get_data (surface);
+     width = cairo_image_surface_get_width (surface);
+     height = cairo_image_surface_get_height (surface);
+     stride = cairo_image_surface_get_stride (surface) / sizeof (guint32);
+     if (pixels == NULL || width <= 0 || height <= 0)
+          return;
+     
+     /* Scratch buffer is allocated once and reused by all passes. */
+     scratch = g_new (guint32, stride * height + width * 4);
+     sums = scratch + stride * height;
+     
+     _calc_box_sizes (sigma, sizes, BOX_BLUR_PASSES);
+     for (i = 0; i < BOX_BLUR_PASSES; i++)
+     {
+          int radius = (sizes[i] - 1) / 2;
+          if (radius <= 0)
+               continue;
+          
+          _box_blur_rows (pixels, scratch, width, stride, 0, height, radius);
+          _box_blur_columns (scratch, pixels, sums, width, height, stride, 0, width, radius);
+     }
+     
+     g_free (scratch);
+     cairo_surface_mark_dirty (surface);
+}
+
+struct _box_blur_task
+{
+     guint32 *pixels;
+     guint32 *scratch;
+     guint32 *sums;
+     int width;
+     int height;
+     int stride;
+     int thread_num;
+};
+
+struct _box_blur_job
+{
+     struct _box_blur_task *task;
+     int index;
+     int radius;
+     int vertical;
+};
+
+/* Job blurs its own band of rows in horizontal pass, or its own band of columns in vertical pass. */
+static void *
+_box_blur_job_run (void *data) {
+     struct _box_blur_job *job = data;
+     struct _box_blur_task *task = job->task;
+     
+     if (job->vertical)
+          _box_blur_columns (task->scratch, task->pixels, task->sums, task->width, task->height, task->stride,
+                             task->width * job->index / task->thread_num,
+                             task->width * (job->index + 1) / task->thread_num,
+                             job->radius);
+     else
+          _box_blur_rows (task->pixels, task->scratch, task->width, task->stride,
+                          task->height * job->index / task->thread_num,
+                          task->height * (job->index + 1) / task->thread_num,
+                          job->radius);
+     
+     return NULL;
+}
+
+/* Worker pool of box blur, workers start when first threaded blur and keep waiting for next pass.
+ * Jobs of pass are claimed one by one, so caller thread run jobs too, and pass finish even no worker started. */
+struct _box_blur_pool
+{
+     pthread_mutex_t run_lock;  /* one blur use pool at a time */
+     pthread_mutex_t lock;
+     pthread_cond_t start_cond;
+     pthread_cond_t done_cond;
+     int worker_num;
+     unsigned long generation;  /* increase when new pass start */
+     struct _box_blur_task *task;
+     int radius;
+     int vertical;
+     int next_job;
+     int pending_jobs;
+};
+
+static struct _box_blur_pool box_blur_pool = {
+     PTHREAD_MUTEX_INITIALIZER,
+     PTHREAD_MUTEX_INITIALIZER,
+     PTHREAD_COND_INITIALIZER,
+     PTHREAD_COND_INITIALIZER,
+     0, 0, NULL, 0, 0, 0, 0
+};
+
+/* Run jobs of current pass until all jobs claimed, call with pool lock held. */
+static void
+_box_blur_pool_run_jobs (struct _box_blur_pool *pool) {
+     struct _box_blur_job job;
+     
+     while (pool->task != NULL && pool->next_job < pool->task->thread_num)
+     {
+          job.task = pool->task;
+          job.index = pool->next_job++;
+          job.radius = pool->radius;
+          job.vertical = pool->vertical;
+          
+          pthread_mutex_unlock (&pool->lock);
+          _box_blur_job_run (&job);
+          pthread_mutex_lock (&pool->lock);
+          
+          if (--pool->pending_jobs == 0)
+               pthread_cond_signal (&pool->done_cond);
+     }
+}
+
+static void *
+_box_blur_pool_worker (void *data) {
+     struct _box_blur_pool *pool = data;
+     unsigned long generation = 0;
+     
+     pthread_mutex_lock (&pool->lock);
+     while (TRUE)
+     {
+          while (pool->generation == generation)
+               pthread_cond_wait (&pool->start_cond, &pool->lock);
+          generation = pool->generation;
+          
+          _box_blur_pool_run_jobs (pool);
+     }
+     
+     return NULL;
+}
+
+/* Start workers until pool has worker_num workers, stop start if thread can't create. */
+static void
+_box_blur_pool_start_workers (struct _box_blur_pool *pool, int worker_num) {
+     pthread_attr_t attr;
+     pthread_t thread;
+     
+     pthread_attr_init (&attr);
+     pthread_attr_setdetachstate (&attr, PTHREAD_CREATE_DETACHED);
+     
+     pthread_mutex_lock (&pool->lock);
+     while (pool->worker_num < worker_num
+            && pthread_create (&thread, &attr, _box_blur_pool_worker, pool) == 0)
+          pool->worker_num++;
+     pthread_mutex_unlock (&pool->lock);
+     
+     pthread_attr_destroy (&attr);
+}
+
+/* Split pass into thread_num jobs, and wait pool and current thread finish them. */
+static void
+_box_blur_run_pass (struct _box_blur_task *task, int radius, int vertical) {
+     struct _box_blur_pool *pool = &box_blur_pool;
+     
+     pthread_mutex_lock (&pool->lock);
+     pool->task = task;
+     pool->radius = radius;
+     pool->vertical = vertical;
+     pool->next_job = 0;
+     pool->pending_jobs = task->thread_num;
+     pool->generation++;
+     pthread_cond_broadcast (&pool->start_cond);
+     
+     _box_blur_pool_run_jobs (pool);
+     while (pool->pending_jobs > 0)
+          pthread_cond_wait (&pool->done_cond, &pool->lock);
+     pool->task = NULL;
+     pthread_mutex_unlock (&pool->lock);
+}
+
+static void box_blur_image_surface_threads (cairo_surface_t *surface, double sigma, int thread_num) {
+     int sizes[BOX_BLUR_PASSES];
+     struct _box_blur_task task;
+     int width, height, i;
+     
+     if (sigma <= 0)
+          return;
+     
+     width = cairo_image_surface_get_width (surface);
+     height = cairo_image_surface_get_height (surface);
+     
+     /* Pick thread number, small surface is not worth to split. */
+     if (thread_num <= 0)
+          thread_num = sysconf (_SC_NPROCESSORS_ONLN);
+     if (thread_num > BLUR_MAX_THREADS)
+          thread_num = BLUR_MAX_THREADS;
+     if (thread_num > width)
+          thread_num = width;
+     if (thread_num > height)
+          thread_num = height;
+     if (thread_num <= 1 || width * height < BLUR_MIN_THREAD_PIXELS)
+     {
+          box_blur_image_surface (surface, sigma);
+          return;
+     }
+     
+     /* Pool is busy with blur of other thread, just blur in current thread. */
+     if (pthread_mutex_trylock (&box_blur_pool.run_lock) != 0)
+     {
+          box_blur_image_surface (surface, sigma);
+          return;
+     }
+     
+     cairo_surface_flush (surface);
+     task.pixels = (guint32*) cairo_image_surface_get_data (surface);
+     if (task.pixels == NULL)
+     {
+          pthread_mutex_unlock (&box_blur_pool.run_lock);
+          return;
+     }
+     task.width = width;
+     task.height = height;
+     task.stride = cairo_image_surface_get_stride (surface) / sizeof (guint32);
+     task.scratch = g_new (guint32, task.stride * height + width * 4);
+     task.sums = task.scratch + task.stride * height;
+     task.thread_num = thread_num;
+     
+     /* Current thread run jobs too, so pool need thread_num - 1 workers. */
+     _box_blur_pool_start_workers (&box_blur_pool, thread_num - 1);
+     
+     _calc_box_sizes (sigma, sizes, BOX_BLUR_PASSES);
+     for (i = 0; i < BOX_BLUR_PASSES; i++)
+     {
+          int radius = (sizes[i] - 1) / 2;
+          if (radius <= 0)
+               continue;
+          
+          _box_blur_run_pass (&task, radius, FALSE);
+          _box_blur_run_pass (&task, radius, TRUE);
+     }
+     
+     pthread_mutex_unlock (&box_blur_pool.run_lock);
+     
+     g_free (task.scratch);
+     cairo_surface_mark_dirty (surface);
+}
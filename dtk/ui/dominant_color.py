@@ -23,14 +23,104 @@
 from PIL import Image
 from constant import SHADE_SIZE
 from draw import draw_pixbuf, draw_vlinear, draw_hlinear
-from utils import propagate_expose, color_hex_to_cairo, find_similar_color
+from lru_cache import LRUCache
+from utils import (propagate_expose, color_hex_to_cairo, find_similar_color,
+                   create_directory, read_first_line, write_file)
 import gtk
-import scipy
-import scipy.cluster
-import scipy.misc
+import hashlib
+import numpy
+import os
+import threading
 import urllib
+import uuid
 
-def get_dominant_color(image_path):
+DOMINANT_COLOR_SAMPLE_SIZE = 64  # size of thumbnail to sample colors
+DOMINANT_COLOR_QUANTIZE_BITS = 4 # bits of every channel in color histogram
+
+DOMINANT_COLOR_CACHE_DIR = os.path.expanduser("~/.cache/deepin-ui/dominant_color")
+DOMINANT_COLOR_CACHE_SIZE = 32  # number of images that dominant color cache in memory
+dominant_color_cache = LRUCache(DOMINANT_COLOR_CACHE_SIZE)
+dominant_color_cache_lock = threading.Lock() # function call in worker threads too
+
+def get_dominant_color(image_path, use_kmeans=False):
+    '''
+    Get dominant color of image, use scipy k-means if use_kmeans is True.
+    
+    Result cache in memory with path, mtime and size of image, and cache in disk with content hash of image.
+    '''
+    # Read dominant color from memory cache, avoid read whole image to hash it.
+    file_stat = os.stat(image_path)
+    path_key = (image_path, file_stat.st_mtime, file_stat.st_size, use_kmeans)
+    with dominant_color_cache_lock:
+        dominant_color = dominant_color_cache.get(path_key)
+    if dominant_color != None:
+        return dominant_color
+    
+    # Read dominant color from disk cache, same image share cache even it's copied to other path.
+    cache_key = get_dominant_color_cache_key(image_path, use_kmeans)
+    cache_path = os.path.join(DOMINANT_COLOR_CACHE_DIR, cache_key)
+    dominant_color = read_first_line(cache_path, True)
+    if not dominant_color.startswith("#"):
+        if use_kmeans:
+            dominant_color = get_dominant_color_kmeans(image_path)
+        else:
+            dominant_color = get_dominant_color_histogram(image_path)
+            
+        # Save dominant color to disk cache, write temp file first to make sure cache file is complete.
+        try:
+            create_directory(DOMINANT_COLOR_CACHE_DIR)
+            temp_path = "%s.%s" % (cache_path, uuid.uuid4())
+            write_file(temp_path, dominant_color)
+            os.rename(temp_path, cache_path)
+        except Exception, e:
+            print "get_dominant_color error: %s" % (e)
+    
+    with dominant_color_cache_lock:
+        dominant_color_cache.set(path_key, dominant_color)
+    return dominant_color
+
+def get_dominant_color_cache_key(image_path, use_kmeans=False):
+    '''Get cache key of dominant color, hash of image content and algorithm.'''
+    content_hash = hashlib.sha1()
+    if use_kmeans:
+        content_hash.update("kmeans:")
+    else:
+        content_hash.update("histogram:%s:%s:" % (DOMINANT_COLOR_SAMPLE_SIZE, DOMINANT_COLOR_QUANTIZE_BITS))
+        
+    image_file = open(image_path, "rb")
+    try:
+        for chunk in iter(lambda : image_file.read(1024 * 1024), ""):
+            content_hash.update(chunk)
+    finally:
+        image_file.close()
+        
+    return content_hash.hexdigest()
+
+def get_dominant_color_histogram(image_path):
+    '''Get dominant color of image with quantized color histogram.'''
+    # Decode image near sample size, draft make JPEG decoder skip unnecessary resolution.
+    im = Image.open(image_path)
+    im.draft("RGB", (DOMINANT_COLOR_SAMPLE_SIZE, DOMINANT_COLOR_SAMPLE_SIZE))
+    im = im.convert("RGB").resize((DOMINANT_COLOR_SAMPLE_SIZE, DOMINANT_COLOR_SAMPLE_SIZE))
+    ar = numpy.asarray(im, dtype=numpy.int32).reshape(-1, 3)
+    
+    # Count pixels of quantized colors.
+    bits = DOMINANT_COLOR_QUANTIZE_BITS
+    shift = 8 - bits
+    keys = ((ar[:, 0] >> shift) << (bits * 2)) | ((ar[:, 1] >> shift) << bits) | (ar[:, 2] >> shift)
+    counts = numpy.bincount(keys, minlength=1 << (bits * 3))
+    
+    # Dominant color is average color of most frequent bucket, 
+    # argmax pick first bucket when counts equal, so result is deterministic.
+    peak = ar[keys == numpy.argmax(counts)].mean(axis=0)
+    return "#%02x%02x%02x" % tuple([int(round(c)) for c in peak])
+
+def get_dominant_color_kmeans(image_path):
+    '''Get dominant color of image with scipy k-means, slow and need scipy installed.'''
+    import scipy
+    import scipy.cluster
+    import scipy.misc
+    
     # print 'reading image'
     im = Image.open(image_path)
     im = im.resize((150, 150))      # optional, to reduce time
@@ -21,6 +21,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from constant import DEFAULT_FONT, DEFAULT_FONT_SIZE
+from lru_cache import LRUCache
 from math import pi
 import cairo
 import dtk_cairo_blur    
@@ -30,7 +31,7 @@ import pango
 import pangocairo
 from utils import (cairo_state, cairo_disable_antialias, color_hex_to_cairo, 
                    add_color_stop_rgba, propagate_expose, 
-                   alpha_color_hex_to_cairo, layout_set_markup)
+                   alpha_color_hex_to_cairo, get_text_layout, get_text_layout_ticker)
 
 def draw_radial_ring(cr, x, y, outer_radius, inner_radius, color_infos):
     '''Draw radial ring.'''
@@ -229,6 +230,9 @@ def draw_window_rectangle(cr, sx, sy, ex, ey, r):
         cr.arc(sx + r, ey - r, r, pi / 2, pi) # bottom-left
         cr.stroke()
         
+TEXT_SURFACE_CACHE_SIZE = 4 * 1024 * 1024 # bytes
+text_surface_cache = LRUCache(TEXT_SURFACE_CACHE_SIZE)
+
 def draw_text(cr, markup, x, y, w, h, text_size=DEFAULT_FONT_SIZE, text_color="#000000", 
               text_font=DEFAULT_FONT, alignment=pango.ALIGN_LEFT,
               gaussian_radious=None, gaussian_color=None,
@@ -239,65 +243,80 @@ def draw_text(cr, markup, x, y, w, h, text_size=DEFAULT_FONT_SIZE, text_color="#
         render_text(cr, markup, x, y, w, h, text_size, text_color, text_font, alignment,
                     wrap_width=wrap_width)
     elif (border_radious != None and border_color != None) or (gaussian_radious != None and gaussian_color != None):
-        # Create text cairo context.
-        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, w, h)
-        text_cr = cairo.Context(surface)
-        
-        # Draw gaussian light.
-        if gaussian_radious != None and gaussian_color != None:
-            text_cr.save()
-            render_text(text_cr, markup, gaussian_radious, 
-                        gaussian_radious, w - gaussian_radious * 2, h - gaussian_radious * 2, 
-                        text_size, gaussian_color, alignment=alignment,
-                        wrap_width=wrap_width)
-            dtk_cairo_blur.gaussian_blur(surface, gaussian_radious)
-            text_cr.restore()
-        
-        # Make sure border can render correctly.
-        if gaussian_radious == None:
-            gaussian_radious = 0
-            
-        # Draw gaussian border.
-        if border_radious != None and border_radious != 0 and border_color != None:
-            render_text(text_cr, markup, gaussian_radious, gaussian_radious, w - gaussian_radious * 2, 
-                        h - gaussian_radious * 2, text_size, border_color, alignment=alignment,
-                        wrap_width=wrap_width)
-            dtk_cairo_blur.gaussian_blur(surface, border_radious)
-        
-        # Draw font.
-        render_text(text_cr, markup, gaussian_radious, gaussian_radious, w - gaussian_radious * 2, 
-                    h - gaussian_radious * 2, text_size, text_color, alignment=alignment,
-                    wrap_width=wrap_width)
+        # Get text surface from cache, just render and blur when cache miss.
+        cache_key = (markup, w, h, text_size, text_color, text_font, alignment,
+                     gaussian_radious, gaussian_color, border_radious, border_color, 
+                     wrap_width, get_text_layout_ticker())
+        surface = text_surface_cache.get(cache_key)
+        if surface == None:
+            surface = create_text_surface(
+                markup, w, h, text_size, text_color, alignment,
+                gaussian_radious, gaussian_color, border_radious, border_color,
+                wrap_width)
+            text_surface_cache.set(cache_key, surface, w * h * 4)
         
         # Render gaussian text to target cairo context.
         cr.set_source_surface(surface, x, y)
         cr.paint()
+        
+def create_text_surface(markup, w, h, text_size, text_color, alignment,
+                        gaussian_radious, gaussian_color, border_radious, border_color, 
+                        wrap_width):
+    '''Create text surface with gaussian light or gaussian border.'''
+    # Create text cairo context.
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, w, h)
+    text_cr = cairo.Context(surface)
+    
+    # Draw gaussian light.
+    if gaussian_radious != None and gaussian_color != None:
+        text_cr.save()
+        render_text(text_cr, markup, gaussian_radious, 
+                    gaussian_radious, w - gaussian_radious * 2, h - gaussian_radious * 2, 
+                    text_size, gaussian_color, alignment=alignment,
+                    wrap_width=wrap_width)
+        dtk_cairo_blur.gaussian_blur(surface, gaussian_radious)
+        text_cr.restore()
+    
+    # Make sure border can render correctly.
+    if gaussian_radious == None:
+        gaussian_radious = 0
+        
+    # Draw gaussian border.
+    if border_radious != None and border_radious != 0 and border_color != None:
+        render_text(text_cr, markup, gaussian_radious, gaussian_radious, w - gaussian_radious * 2, 
+                    h - gaussian_radious * 2, text_size, border_color, alignment=alignment,
+                    wrap_width=wrap_width)
+        dtk_cairo_blur.gaussian_blur(surface, border_radious)
+    
+    # Draw font.
+    render_text(text_cr, markup, gaussian_radious, gaussian_radious, w - gaussian_radious * 2, 
+                h - gaussian_radious * 2, text_size, text_color, alignment=alignment,
+                wrap_width=wrap_width)
+    
+    return surface
+
+def clear_text_surface_cache():
+    '''Clear text surface cache.'''
+    text_surface_cache.clear()
     
 def render_text(cr, markup, x, y, w, h, text_size=DEFAULT_FONT_SIZE, text_color="#000000", 
                 text_font=DEFAULT_FONT, alignment=pango.ALIGN_LEFT,
                 wrap_width=None):
     '''Draw string.'''
-    # Create pangocairo context.
-    context = pangocairo.CairoContext(cr)
-    
-    # Set layout.
-    layout = context.create_layout()
-    layout.set_font_description(pango.FontDescription("%s %s" % (text_font, text_size)))
-    layout_set_markup(layout, markup)
-    layout.set_alignment(alignment)
+    # Get cache layout.
     if wrap_width == None:
-        layout.set_single_paragraph_mode(True)
-        layout.set_width(w * pango.SCALE)
-        layout.set_ellipsize(pango.ELLIPSIZE_END)
+        (layout, _) = get_text_layout(markup, text_size, text_font, width=w, alignment=alignment)
     else:
-        layout.set_width(wrap_width * pango.SCALE)
-        layout.set_wrap(pango.WRAP_WORD)
+        (layout, _) = get_text_layout(markup, text_size, text_font, wrap_width=wrap_width, alignment=alignment)
+    
+    # Update layout with current cairo context.
+    context = pangocairo.CairoContext(cr)
+    context.update_layout(layout)
     (text_width, text_height) = layout.get_pixel_size()
     
     # Draw text.
     cr.move_to(x, y + (h - text_height) / 2)
     cr.set_source_rgb(*color_hex_to_cairo(text_color))
-    context.update_layout(layout)
     context.show_layout(layout)
         
 def draw_line(cr, sx, sy, ex, ey, line_width=1, antialias_status=cairo.ANTIALIAS_NONE):
@@ -365,9 +384,69 @@ def expose_linear_background(widget, event, color_infos):
     
     return True
 
+WINDOW_SHADOW_CACHE_SIZE = 16
+window_shadow_cache = LRUCache(WINDOW_SHADOW_CACHE_SIZE)
+
 def draw_window_shadow(cr, x, y, w, h, r, p, color_window_shadow):
-    '''Draw window shadow.'''
+    '''Draw window shadow, blit nine-slice tiles from cache.'''
     color_infos = color_window_shadow.get_color_info()
+    
+    # Render directly if window smaller than shadow template, 
+    # round gradients of corners overlap in such small window, so tiles can't match it.
+    size = r * 4 + 1
+    if w < size or h < size:
+        render_window_shadow(cr, x, y, w, h, r, p, color_infos)
+        return
+    
+    (surface, top_tile, bottom_tile, left_tile, right_tile) = get_window_shadow_tiles(r, p, color_infos)
+    side = size - r
+    with cairo_state(cr):
+        # Draw four corner.
+        for (tile_x, tile_y, dest_x, dest_y) in [(0, 0, x, y),
+                                                 (side, 0, x + w - r, y),
+                                                 (0, side, x, y + h - r),
+                                                 (side, side, x + w - r, y + h - r)]:
+            cr.set_source_surface(surface, dest_x - tile_x, dest_y - tile_y)
+            cr.rectangle(dest_x, dest_y, r, r)
+            cr.fill()
+            
+        # Draw four side.
+        for (tile, dest_x, dest_y, dest_w, dest_h) in [(top_tile, x + r, y, w - r * 2, r),
+                                                       (bottom_tile, x + r, y + h - r, w - r * 2, r),
+                                                       (left_tile, x, y + r, r, h - r * 2),
+                                                       (right_tile, x + w - r, y + r, r, h - r * 2)]:
+            cr.set_source_surface(tile, dest_x, dest_y)
+            cr.get_source().set_extend(cairo.EXTEND_REPEAT)
+            cr.rectangle(dest_x, dest_y, dest_w, dest_h)
+            cr.fill()
+            
+def get_window_shadow_tiles(r, p, color_infos):
+    '''Get shadow surface and four side tiles, render once for same radius, padding and colors.'''
+    cache_key = (r, p, tuple([(pos, tuple(color_info)) for (pos, color_info) in color_infos]))
+    tiles = window_shadow_cache.get(cache_key)
+    if tiles == None:
+        # Render shadow template, make it 4r + 1 wide that every corner just covered by its own round gradient.
+        size = r * 4 + 1
+        side = size - r
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, size, size)
+        render_window_shadow(cairo.Context(surface), 0, 0, size, size, r, p, color_infos)
+        
+        # Cut side tiles from shadow surface, side gradient is same along side, so one pixel long is enough.
+        side_tiles = []
+        for (tile_x, tile_y, tile_w, tile_h) in [(r, 0, 1, r), (r, side, 1, r), (0, r, r, 1), (side, r, r, 1)]:
+            tile = cairo.ImageSurface(cairo.FORMAT_ARGB32, tile_w, tile_h)
+            tile_cr = cairo.Context(tile)
+            tile_cr.set_source_surface(surface, -tile_x, -tile_y)
+            tile_cr.paint()
+            side_tiles.append(tile)
+        
+        tiles = tuple([surface] + side_tiles)
+        window_shadow_cache.set(cache_key, tiles)
+        
+    return tiles
+    
+def render_window_shadow(cr, x, y, w, h, r, p, color_infos):
+    '''Render window shadow with gradient.'''
     with cairo_state(cr):
         # Clip four corner.
         cr.rectangle(x, y, r - 1, r - 1) # top-left
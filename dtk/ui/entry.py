@@ -33,7 +33,8 @@ import pango
 import pangocairo
 from utils import (propagate_expose, cairo_state, color_hex_to_cairo, 
                    get_content_size, is_double_click, is_right_button, 
-                   is_left_button, alpha_color_hex_to_cairo, cairo_disable_antialias)
+                   is_left_button, alpha_color_hex_to_cairo, cairo_disable_antialias,
+                   get_font_description)
 
 class Entry(gtk.EventBox):
     '''Entry.'''
@@ -518,7 +519,7 @@ class Entry(gtk.EventBox):
             
             # Set layout.
             layout = context.create_layout()
-            layout.set_font_description(pango.FontDescription("%s %s" % (DEFAULT_FONT, self.font_size)))
+            layout.set_font_description(get_font_description(DEFAULT_FONT, self.font_size))
             
             if not self.get_sensitive():
                 # Set text.
@@ -687,7 +688,7 @@ class Entry(gtk.EventBox):
             cr = widget.window.cairo_create()
             context = pangocairo.CairoContext(cr)
             layout = context.create_layout()
-            layout.set_font_description(pango.FontDescription("%s %s" % (DEFAULT_FONT, self.font_size)))
+            layout.set_font_description(get_font_description(DEFAULT_FONT, self.font_size))
             layout.set_text(self.content)
             (text_width, text_height) = layout.get_pixel_size()
             (x_index, y_index) = layout.xy_to_index((self.offset_x + rect.width - self.padding_x * 2) * pango.SCALE, 0)
@@ -700,7 +701,7 @@ class Entry(gtk.EventBox):
             cr = widget.window.cairo_create()
             context = pangocairo.CairoContext(cr)
             layout = context.create_layout()
-            layout.set_font_description(pango.FontDescription("%s %s" % (DEFAULT_FONT, self.font_size)))
+            layout.set_font_description(get_font_description(DEFAULT_FONT, self.font_size))
             layout.set_text(self.content)
             (text_width, text_height) = layout.get_pixel_size()
             (x_index, y_index) = layout.xy_to_index((self.offset_x + self.padding_x) * pango.SCALE, 0)
@@ -712,7 +713,7 @@ class Entry(gtk.EventBox):
         cr = widget.window.cairo_create()
         context = pangocairo.CairoContext(cr)
         layout = context.create_layout()
-        layout.set_font_description(pango.FontDescription("%s %s" % (DEFAULT_FONT, self.font_size)))
+        layout.set_font_description(get_font_description(DEFAULT_FONT, self.font_size))
         layout.set_text(self.content)
         (text_width, text_height) = layout.get_pixel_size()
         if int(event.x) + self.offset_x - self.padding_x > text_width:
@@ -21,7 +21,9 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from draw import draw_pixbuf, draw_vlinear
+from item_image_loader import item_image_loader
 from keymap import get_keyevent_name
+from redraw_scheduler import redraw_scheduler
 from skin_config import skin_config
 from theme import ui_theme
 import gobject
@@ -79,8 +81,10 @@ class IconView(gtk.DrawingArea):
         
         # Redraw.
         self.redraw_request_list = []
-        self.redraw_delay = 100 # 100 milliseconds should be enough for redraw
-        gtk.timeout_add(self.redraw_delay, self.update_redraw_request_list)
+        self.connect("destroy", lambda w: redraw_scheduler.remove_widget(self))
+        
+        # Cancel image loading when destroy.
+        self.connect("destroy", lambda w: item_image_loader.remove_view(self))
         
         self.keymap = {
             "Home" : self.select_first_item,
@@ -325,6 +329,10 @@ class IconView(gtk.DrawingArea):
         cr = widget.window.cairo_create()
         rect = widget.allocation
         
+        # Just draw in expose area.
+        cr.rectangle(event.area.x, event.area.y, event.area.width, event.area.height)
+        cr.clip()
+        
         # Get offset.
         (offset_x, offset_y, viewport) = self.get_offset_coordinate(widget)
             
@@ -357,17 +365,14 @@ class IconView(gtk.DrawingArea):
                 scrolled_window = get_match_parent(self, ["ScrolledWindow"])
                 columns = int((scrolled_window.allocation.width - self.padding_x * 2) / item_width)
                     
-                # Get viewport index.
-                start_y = offset_y - self.padding_y
-                start_row = max(int(start_y / item_height), 0)
-                start_index = start_row * columns
+                # Get index of items in viewport and expose area.
+                (start_index, end_index) = self.get_viewport_index(offset_y, viewport, item_height, columns)
                 
-                end_y = offset_y - self.padding_y + viewport.allocation.height
-                if end_y % item_height == 0:
-                    end_row = end_y / item_height - 1
-                else:
-                    end_row = end_y / item_height
-                end_index = min((end_row + 1) * columns, len(self.items))
+                # Load images of items in viewport first.
+                item_image_loader.update_viewport(self, self.items[start_index:end_index], start_index)
+                
+                start_index = max(start_index, (event.area.y - self.padding_y) / item_height * columns)
+                end_index = min(end_index, ((event.area.y + event.area.height - self.padding_y) / item_height + 1) * columns)
                 
                 for (index, item) in enumerate(self.items[start_index:end_index]):
                     row = int((start_index + index) / columns)
@@ -375,12 +380,19 @@ class IconView(gtk.DrawingArea):
                     render_x = rect.x + self.padding_x + column * item_width
                     render_y = rect.y + self.padding_y + row * item_height
                     
+                    # Skip item out of expose area.
+                    if (render_x >= event.area.x + event.area.width 
+                        or render_x + item_width <= event.area.x):
+                        continue
+                    
                     with cairo_state(cr):
                         # Don't allow draw out of item area.
                         cr.rectangle(render_x, render_y, item_width, item_height)
                         cr.clip()
                         
                         item.render(cr, gtk.gdk.Rectangle(render_x, render_y, item_width, item_height))
+        else:
+            item_image_loader.update_viewport(self, [])
                         
     def clear_focus_item(self):
         '''Clear focus item status.'''
@@ -531,32 +543,45 @@ class IconView(gtk.DrawingArea):
             item_width, item_height = self.items[0].get_width(), self.items[0].get_height()
             scrolled_window = get_match_parent(self, ["ScrolledWindow"])
             columns = int((scrolled_window.allocation.width - self.padding_x * 2) / item_width)
-                
-            start_y = offset_y - self.padding_y
-            start_row = max(int(start_y / item_height), 0)
-            start_index = start_row * columns
+            (start_index, end_index) = self.get_viewport_index(offset_y, viewport, item_height, columns)
             
-            end_y = offset_y - self.padding_y + viewport.allocation.height
-            if end_y % item_height == 0:
-                end_row = end_y / item_height - 1
-            else:
-                end_row = end_y / item_height
-            end_index = min((end_row + 1) * columns, len(self.items))
+            # Just redraw area of request items in viewport.
+            viewport_indexes = {}
+            for index in range(start_index, end_index):
+                viewport_indexes[id(self.items[index])] = index
             
-            # Redraw whole viewport area once found any request item in viewport.
+            redraw_indexes = set()
             for item in self.redraw_request_list:
-                if item in self.items[start_index:end_index]:
-                    self.queue_draw()
-                    break
+                index = viewport_indexes.get(id(item))
+                if index != None and not index in redraw_indexes:
+                    redraw_indexes.add(index)
+                    self.queue_draw_area(
+                        self.padding_x + (index % columns) * item_width,
+                        self.padding_y + (index / columns) * item_height,
+                        item_width, item_height)
         
         # Clear redraw request list.
         self.redraw_request_list = []
-
-        return True
+    
+    def get_viewport_index(self, offset_y, viewport, item_height, columns):
+        '''Get index range of items in viewport, return (start_index, end_index).'''
+        start_y = offset_y - self.padding_y
+        start_row = max(int(start_y / item_height), 0)
+        start_index = start_row * columns
+        
+        end_y = offset_y - self.padding_y + viewport.allocation.height
+        if end_y % item_height == 0:
+            end_row = end_y / item_height - 1
+        else:
+            end_row = end_y / item_height
+        end_index = min((end_row + 1) * columns, len(self.items))
+        
+        return (start_index, end_index)
     
     def redraw_item(self, list_item):
         '''Redraw item.'''
         self.redraw_request_list.append(list_item)
+        redraw_scheduler.add_widget(self)
         
     def get_offset_coordinate(self, widget):
         '''Get offset coordinate.'''
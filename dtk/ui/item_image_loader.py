@@ -0,0 +1,112 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2011 ~ 2012 Deepin, Inc.
+#               2011 ~ 2012 Wang Yong
+# 
+# Author:     Wang Yong <lazycat.manatee@gmail.com>
+# Maintainer: Wang Yong <lazycat.manatee@gmail.com>
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from thread_pool import MissionWorkerPool
+from threads import main_loop_dispatcher
+import Queue as Q
+
+class ItemImageLoader(object):
+    '''
+    Load images of view items in background, items in viewport load first.
+    
+    Item need implement below interfaces to load image lazily:
+    
+    * need_load_image() : return True if item haven't load image, call in main thread.
+    * load_image() : load image and return it, call in worker thread.
+    * set_image(image) : set image loaded by load_image, call in main thread, image is None if load failed.
+    '''
+    
+    def __init__(self, worker_num=2):
+        '''Init item image loader.'''
+        self.worker_num = worker_num
+        self.pool = None
+        self.view_dict = {}     # view -> {item : (priority, future)}
+        
+    def get_pool(self):
+        '''Get worker pool, create it when first use.'''
+        if self.pool == None:
+            self.pool = MissionWorkerPool(self.worker_num)
+        return self.pool
+        
+    def update_viewport(self, view, items, start_index=0):
+        '''
+        Update items in viewport of view, call in expose path of view, start_index is index of first item in view.
+        
+        Missions of items out of viewport will be cancelled, 
+        and items in viewport load image by their order in view.
+        '''
+        # Get items need load image, priority is index in view, 
+        # so priority of waiting missions don't change when scroll.
+        visible_dict = {}
+        for (index, item) in enumerate(items):
+            if hasattr(item, "need_load_image") and item.need_load_image():
+                visible_dict[item] = start_index + index
+                
+        # Nothing to load or cancel, don't touch worker pool.
+        if len(visible_dict) == 0 and not self.view_dict.has_key(view):
+            return
+        missions = self.view_dict.setdefault(view, {})
+        
+        # Cancel missions of items out of viewport.
+        for (item, (priority, future)) in missions.items():
+            if not visible_dict.has_key(item) and future.cancel():
+                del missions[item]
+            
+        # Add missions of new visible items, and reorder waiting missions if items insert or remove before them.
+        for (item, priority) in sorted(visible_dict.items(), key=lambda (item, priority): priority):
+            if missions.has_key(item):
+                (old_priority, future) = missions[item]
+                if old_priority == priority or not future.cancel():
+                    continue
+                del missions[item]
+                
+            # Don't block expose when mission queue is full, try again in next expose.
+            try:
+                missions[item] = (priority, self.get_pool().add_mission(
+                        item.load_image, priority, 
+                        lambda future, view=view, item=item: main_loop_dispatcher.dispatch(
+                            self.finish_load, view, item, future),
+                        block=False))
+            except Q.Full:
+                break
+            
+        if len(missions) == 0:
+            del self.view_dict[view]
+            
+    def finish_load(self, view, item, future):
+        '''Finish load image, set image to item in main thread.'''
+        missions = self.view_dict.get(view, {})
+        if missions.has_key(item) and missions[item][1] == future:
+            del missions[item]
+            if len(missions) == 0:
+                del self.view_dict[view]
+        
+        item.set_image(future.get_result(0))
+        
+    def remove_view(self, view):
+        '''Cancel all waiting missions of view.'''
+        if self.view_dict.has_key(view):
+            for (priority, future) in self.view_dict[view].values():
+                future.cancel()
+            del self.view_dict[view]
+            
+item_image_loader = ItemImageLoader()
@@ -24,7 +24,7 @@ from constant import DEFAULT_FONT_SIZE, ALIGN_START, DEFAULT_FONT
 from draw import draw_text, draw_hlinear
 from keymap import get_keyevent_name
 from theme import ui_theme
-from utils import propagate_expose, get_content_size, is_double_click, is_left_button
+from utils import propagate_expose, get_content_size, is_double_click, is_left_button, get_font_description
 import gtk
 import pango 
 import pangocairo
@@ -163,7 +163,7 @@ class Label(gtk.EventBox):
         cr = widget.window.cairo_create()
         context = pangocairo.CairoContext(cr)
         layout = context.create_layout()
-        layout.set_font_description(pango.FontDescription("%s %s" % (DEFAULT_FONT, self.text_size)))
+        layout.set_font_description(get_font_description(DEFAULT_FONT, self.text_size))
         layout.set_text(self.text)
         (text_width, text_height) = layout.get_pixel_size()
         if int(event.x) > text_width:
@@ -20,13 +20,18 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from bisect import bisect_left, bisect_right
 from cache_pixbuf import CachePixbuf
 from constant import DEFAULT_FONT_SIZE, ALIGN_END, ALIGN_START
 from contextlib import contextmanager 
 from draw import draw_pixbuf, draw_vlinear, draw_text
+from item_image_loader import item_image_loader
 from keymap import get_keyevent_name, has_ctrl_mask, has_shift_mask
+from lru_cache import LRUCache
+from redraw_scheduler import redraw_scheduler
 from skin_config import skin_config
 from theme import ui_theme
+import cairo
 import copy
 import gobject
 import gtk
@@ -36,7 +41,7 @@ import subprocess
 import tempfile
 from utils import (map_value, mix_list_max, get_content_size, 
                    unzip, last_index, set_cursor, get_match_parent, 
-                   remove_file,
+                   remove_file, get_text_layout_ticker, remove_timeout_id,
                    cairo_state, get_event_coords, is_left_button, 
                    is_right_button, is_double_click, is_single_click, 
                    is_in_rect, get_disperse_index, get_window_shadow_size)
@@ -65,6 +70,9 @@ class ListView(gtk.DrawingArea):
                  enable_drag_drop=True,
                  drag_icon_pixbuf=ui_theme.get_pixbuf("listview/drag_preview.png"),
                  drag_out_offset=50,
+                 measure_sample_size=1000,
+                 enable_row_cache=False,
+                 row_cache_size=8 * 1024 * 1024, # bytes
                  ):
         '''Init list view.'''
         # Init.
@@ -83,18 +91,14 @@ class ListView(gtk.DrawingArea):
         self.title_sorts = None
         self.single_click_row = None
         self.double_click_row = None
-        self.start_select_item = None
         self.enable_drag_drop = enable_drag_drop
         self.start_drag = False
-        self.drag_item = None
         self.highlight_item = None
-        self.before_drag_items = []
-        self.after_drag_items = []
         self.title_offset_y = 0
         self.item_height = 0
         self.press_ctrl = False
         self.press_shift = False
-        self.select_rows = []
+        self.select_rows = RowSelection()
         self.start_select_row = None
         self.press_in_select_rows = None
         self.expand_column = None
@@ -104,6 +108,14 @@ class ListView(gtk.DrawingArea):
         self.enable_multiple_select = enable_multiple_select
         self.drag_icon_pixbuf = drag_icon_pixbuf
         self.drag_out_offset = drag_out_offset
+        self.measure_sample_size = measure_sample_size
+        self.title_sizes = ([], [])
+        self.title_sizes_ticker = get_text_layout_ticker()
+        self.measure_request_items = []
+        self.measure_idle_id = None
+        self.model = None
+        self.enable_row_cache = enable_row_cache
+        self.row_cache = LRUCache(row_cache_size)
         
         # Signal.
         self.connect("realize", self.realize_list_view)
@@ -115,6 +127,7 @@ class ListView(gtk.DrawingArea):
         self.connect("leave-notify-event", self.leave_list_view)
         self.connect("key-press-event", self.key_press_list_view)
         self.connect("key-release-event", self.key_release_list_view)
+        self.connect("style-set", self.style_set_list_view)
         
         # Unset drag source if drag data is not None.
         if self.drag_data:
@@ -123,8 +136,11 @@ class ListView(gtk.DrawingArea):
         
         # Redraw.
         self.redraw_request_list = []
-        self.redraw_delay = 100 # 100 milliseconds should be enough for redraw
-        gtk.timeout_add(self.redraw_delay, self.update_redraw_request_list)
+        self.connect("destroy", lambda w: redraw_scheduler.remove_widget(self))
+        self.connect("destroy", lambda w: remove_timeout_id(self.measure_idle_id))
+        
+        # Cancel image loading when destroy.
+        self.connect("destroy", lambda w: item_image_loader.remove_view(self))
         
         # Add key map.
         self.keymap = {
@@ -155,25 +171,35 @@ class ListView(gtk.DrawingArea):
             (offset_x, offset_y, viewport) = self.get_offset_coordinate(self)
             
             # Get viewport index.
-            start_y = offset_y - self.title_offset_y
-            end_y = offset_y + viewport.allocation.height - self.title_offset_y
-            start_index = max(start_y / self.item_height, 0)
-            if (end_y - end_y / self.item_height * self.item_height) == 0:
-                end_index = min(end_y / self.item_height + 1, len(self.items))
-            else:
-                end_index = min(end_y / self.item_height + 2, len(self.items))        
+            (start_index, end_index) = self.get_viewport_index(offset_y, viewport)
             
-            # Redraw whole viewport area once found any request item in viewport.
-            viewport_range = range(start_index, end_index)    
+            # Get request rows in viewport.
+            redraw_rows = RowSelection()
             for item in self.redraw_request_list:
-                if item.get_index() in viewport_range:
-                    self.queue_draw()
-                    break
+                row = item.get_index()
+                if row != None and start_index <= row < end_index:
+                    redraw_rows.add(row)
+            
+            # Just redraw area of request rows, continuous rows merge in one rectangle.
+            for (start_row, end_row) in redraw_rows.get_ranges():
+                self.queue_draw_area(
+                    0, self.title_offset_y + start_row * self.item_height,
+                    self.allocation.width, (end_row - start_row) * self.item_height)
         
         # Clear redraw request list.
         self.redraw_request_list = []
-
-        return True
+        
+    def get_viewport_index(self, offset_y, viewport):
+        '''Get index range of rows in viewport, return (start_index, end_index).'''
+        start_y = offset_y - self.title_offset_y
+        end_y = offset_y + viewport.allocation.height - self.title_offset_y
+        start_index = max(start_y / self.item_height, 0)
+        if (end_y - end_y / self.item_height * self.item_height) == 0:
+            end_index = min(end_y / self.item_height + 1, len(self.items))
+        else:
+            end_index = min(end_y / self.item_height + 2, len(self.items))        
+            
+        return (start_index, end_index)
         
     def add_titles(self, titles, title_height=24):
         '''Add titles.'''
@@ -186,17 +212,37 @@ class ListView(gtk.DrawingArea):
         self.title_sorts = map_value(self.titles, lambda _: self.SORT_DESCENDING)
         self.set_title_height(title_height)
         
-        (title_widths, title_heights) = self.get_title_sizes()
-        self.cell_widths = mix_list_max(self.cell_widths, title_widths)
-        self.cell_min_widths = mix_list_max(self.cell_min_widths, title_widths)
-        self.cell_min_heights = mix_list_max(self.cell_min_heights, title_heights)
+        self.update_title_sizes()
         
         self.title_cache_pixbufs = []
         for title in self.titles:
             self.title_cache_pixbufs.append(CachePixbuf())
         
     def get_title_sizes(self):
-        '''Get title sizes.'''
+        '''Get title sizes, measure again if text layout cache cleared after last measure (font or theme changed).'''
+        if self.title_sizes_ticker != get_text_layout_ticker():
+            self.update_title_sizes()
+            
+        return self.title_sizes
+    
+    def update_title_sizes(self):
+        '''Measure title sizes again, and update cell sizes with them.'''
+        self.title_sizes = self.measure_title_sizes()
+        self.title_sizes_ticker = get_text_layout_ticker()
+        
+        (title_widths, title_heights) = self.title_sizes
+        self.cell_widths = mix_list_max(self.cell_widths, title_widths)
+        self.cell_min_widths = mix_list_max(self.cell_min_widths, title_widths)
+        self.cell_min_heights = mix_list_max(self.cell_min_heights, title_heights)
+        
+    def style_set_list_view(self, widget, previous_style):
+        '''Measure title sizes again when style changed, font maybe changed.'''
+        if self.titles != None:
+            self.update_title_sizes()
+            self.queue_draw()
+        
+    def measure_title_sizes(self):
+        '''Measure title sizes.'''
         widths = []
         heights = []
         if self.titles != None:
@@ -207,8 +253,134 @@ class ListView(gtk.DrawingArea):
             
         return (widths, heights)    
         
+    def set_model(self, model):
+        '''
+        Set data source of list view, list view switch to virtual mode.
+        
+        In virtual mode, list view won't keep any item object,
+        it just ask model row count and cell renders of rows in visible area,
+        see ListModel for details.
+        '''
+        # Init.
+        self.model = model
+        self.items = ListModelItems(model)
+        self.row_cache.clear()
+        self.start_select_row = None
+        self.select_rows.clear()
+        self.hover_row = None
+        self.highlight_item = None
+        
+        # Re-calcuate.
+        self.update_column_sizes([model.get_column_sizes()])
+        
+        # Update vertical adjustment.
+        self.update_vadjustment()
+        
+        # Redraw.
+        self.queue_draw()
+        
+    def update_model(self):
+        '''Update list view after rows of model changed, only use in virtual mode.'''
+        if self.model != None:
+            # Row content may changed.
+            self.row_cache.clear()
+            
+            # Drop select rows out of range.
+            row_count = len(self.items)
+            self.select_rows.truncate(row_count)
+            if self.start_select_row != None and self.start_select_row >= row_count:
+                self.start_select_row = None
+            if self.hover_row != None and self.hover_row >= row_count:
+                self.hover_row = None
+            if self.highlight_item != None and self.highlight_item.get_index() >= row_count:
+                self.highlight_item = None
+                
+            # Update vertical adjustment.
+            self.update_vadjustment()
+            
+            # Redraw.
+            self.queue_draw()
+        
+    def get_measure_items(self, items):
+        '''Get items need measure when add items, pick sample items evenly if too many items.'''
+        if self.measure_sample_size == None or len(items) <= self.measure_sample_size:
+            return items
+        else:
+            step = float(len(items)) / self.measure_sample_size
+            return map(lambda index: items[int(index * step)], range(0, self.measure_sample_size))
+        
+    def measure_visible_items(self, items):
+        '''Measure visible items, return True if cell size changed.'''
+        column_sizes_list = []
+        for item in items:
+            sizes = item.get_column_sizes()
+            for (index, (width, height)) in enumerate(sizes):
+                if (index >= len(self.cell_min_widths) 
+                    or width > self.cell_min_widths[index] 
+                    or height > self.item_height):
+                    column_sizes_list.append(sizes)
+                    break
+                
+        if column_sizes_list == []:
+            return False
+        else:
+            self.update_column_sizes(column_sizes_list)
+            return True
+        
+    def measure_visible_items_later(self, items):
+        '''Measure visible items in idle, don't change cell sizes when expose.'''
+        self.measure_request_items = items
+        if self.measure_idle_id == None:
+            self.measure_idle_id = gobject.idle_add(self.update_measure_request_items)
+            
+    def update_measure_request_items(self):
+        '''Measure items that request in expose, relayout and redraw if cell size changed.'''
+        self.measure_idle_id = None
+        items = self.measure_request_items
+        self.measure_request_items = []
+        
+        if self.measure_visible_items(items):
+            self.update_vadjustment()
+            self.queue_draw()
+            
+        return False
+        
+    def update_column_sizes(self, column_sizes_list):
+        '''Update cell size with given column sizes list.'''
+        (title_widths, title_heights) = self.get_title_sizes()
+        sort_pixbuf = ui_theme.get_pixbuf("listview/sort_descending.png").get_pixbuf()
+        sort_icon_width = sort_pixbuf.get_width() + self.SORT_PADDING_X * 2
+        sort_icon_height = sort_pixbuf.get_height()
+        
+        cell_min_sizes = []
+        for sizes in column_sizes_list:
+            for (index, (width, height)) in enumerate(sizes):
+                if index >= len(cell_min_sizes):
+                    cell_min_sizes.append((0, 0))
+                    
+                if self.titles == None:
+                    max_width = max([cell_min_sizes[index][0], width])
+                    max_height = max([cell_min_sizes[index][1], sort_icon_height, height])
+                else:
+                    max_width = max([cell_min_sizes[index][0], title_widths[index] + sort_icon_width * 2, width])
+                    max_height = max([cell_min_sizes[index][1], title_heights[index], sort_icon_height, height])
+                
+                cell_min_sizes[index] = (max_width, max_height)
+                
+        if cell_min_sizes != []:
+            (cell_min_widths, cell_min_heights) = unzip(cell_min_sizes)
+            self.cell_min_widths = mix_list_max(self.cell_min_widths, cell_min_widths)
+            self.cell_min_heights = mix_list_max(self.cell_min_heights, cell_min_heights)
+            self.cell_widths = mix_list_max(self.cell_widths, list(cell_min_widths))
+            
+            self.item_height = max(self.item_height, max(cell_min_heights))
+        
     def add_items(self, items, insert_pos=None, sort_list=False):
         '''Add items in list.'''
+        if self.model != None:
+            print "add_items: list view in virtual mode, please add rows to model."
+            return
+        
         # Add new items.
         with self.keep_select_status():    
             if insert_pos == None:
@@ -216,38 +388,13 @@ class ListView(gtk.DrawingArea):
             else:
                 self.items = self.items[0:insert_pos] + items + self.items[insert_pos::]
 
-        # Re-calcuate.
-        (title_widths, title_heights) = self.get_title_sizes()
-        sort_pixbuf = ui_theme.get_pixbuf("listview/sort_descending.png").get_pixbuf()
-        sort_icon_width = sort_pixbuf.get_width() + self.SORT_PADDING_X * 2
-        sort_icon_height = sort_pixbuf.get_height()
-        
-        cell_min_sizes = []
+        # Binding redraw request signal.
         for item in items:
-            # Binding redraw request signal.
             item.connect("redraw_request", self.redraw_item)
             
-            sizes = item.get_column_sizes()
-            if cell_min_sizes == []:
-                cell_min_sizes = sizes
-            else:
-                for (index, (width, height)) in enumerate(sizes):
-                    if self.titles == None:
-                        max_width = max([cell_min_sizes[index][0], width])
-                        max_height = max([cell_min_sizes[index][1], sort_icon_height, height])
-                    else:
-                        max_width = max([cell_min_sizes[index][0], title_widths[index] + sort_icon_width * 2, width])
-                        max_height = max([cell_min_sizes[index][1], title_heights[index], sort_icon_height, height])
-                    
-                    cell_min_sizes[index] = (max_width, max_height)
-        
-        # Get value.
-        (cell_min_widths, cell_min_heights) = unzip(cell_min_sizes)
-        self.cell_min_widths = mix_list_max(self.cell_min_widths, cell_min_widths)
-        self.cell_min_heights = mix_list_max(self.cell_min_heights, cell_min_heights)
-        self.cell_widths = mix_list_max(self.cell_widths, copy.deepcopy(cell_min_widths))
-            
-        self.item_height = max(self.item_height, max(copy.deepcopy(cell_min_heights)))    
+        # Re-calcuate, other items will measure when they visible.
+        self.update_column_sizes(map(lambda item: item.get_column_sizes(), 
+                                     self.get_measure_items(items)))
                     
         # Sort list if sort_list enable.
         if sort_list and self.sorts != [] and self.title_sort_column != None:
@@ -264,32 +411,40 @@ class ListView(gtk.DrawingArea):
                 
         # Update vertical adjustment.
         self.update_vadjustment()        
-            
-        # Update item index.
-        self.update_item_index()
         
     def sort_items(self, compare_method, sort_reverse=False):
         '''Sort items.'''
+        if self.model != None:
+            print "sort_items: list view in virtual mode, please sort rows with model."
+            return
+        
         # Sort items.
         with self.keep_select_status():
             self.items = sorted(self.items,
                                 cmp=compare_method,
                                 reverse=sort_reverse)
             
-        # Update item index.
-        self.update_item_index()    
-        
         # Redraw.
         self.queue_draw()
         
     def redraw_item(self, list_item):
         '''Redraw item.'''
-        self.redraw_request_list.append(list_item)
+        if self.enable_row_cache:
+            self.clear_row_cache(list_item)
         
-    def update_item_index(self):
-        '''Update index of items.'''
-        for (index, item) in enumerate(self.items):
-            item.set_index(index)
+        self.redraw_request_list.append(list_item)
+        redraw_scheduler.add_widget(self)
+        
+    def update_item_index(self, start_index=0, end_index=None):
+        '''Update index of items between [start_index, end_index), default update all items.'''
+        # Row of model know its index, don't need update.
+        if self.model != None:
+            return
+        
+        if end_index == None:
+            end_index = len(self.items)
+        for index in xrange(start_index, end_index):
+            self.items[index].set_index(index)
             
     def set_title_height(self, title_height):
         '''Set title height.'''
@@ -313,6 +468,9 @@ class ListView(gtk.DrawingArea):
             
     def get_cell_widths(self):
         '''Get cell widths.'''
+        if self.titles != None and self.title_sizes_ticker != get_text_layout_ticker():
+            self.update_title_sizes()
+            
         return self.cell_widths
     
     def set_cell_width(self, column, width):
@@ -391,6 +549,10 @@ class ListView(gtk.DrawingArea):
         rect = widget.allocation
         cell_widths = self.get_cell_widths()
         
+        # Just draw in expose area.
+        cr.rectangle(event.area.x, event.area.y, event.area.width, event.area.height)
+        cr.clip()
+        
         # Get offset.
         (offset_x, offset_y, viewport) = self.get_offset_coordinate(widget)
             
@@ -416,6 +578,16 @@ class ListView(gtk.DrawingArea):
                              viewport.allocation.width, viewport.allocation.height - self.title_offset_y)        
                 cr.clip()
                 
+                # Get index of rows in viewport and expose area.
+                (start_index, end_index) = self.get_viewport_index(offset_y, viewport)
+                
+                # Load images of items in viewport first, rows of model don't load image lazily.
+                if self.model == None:
+                    item_image_loader.update_viewport(self, self.items[start_index:end_index], start_index)
+                
+                start_index = max(start_index, (event.area.y - self.title_offset_y) / self.item_height)
+                end_index = min(end_index, (event.area.y + event.area.height - self.title_offset_y) / self.item_height + 1)
+                    
                 # Draw hover row.
                 highlight_row = None
                 if self.highlight_item:
@@ -426,8 +598,8 @@ class ListView(gtk.DrawingArea):
                         cr, offset_x, self.title_offset_y + self.hover_row * self.item_height,
                         viewport.allocation.width, self.item_height)
                 
-                # Draw select rows.
-                for select_row in self.select_rows:
+                # Draw select rows in viewport.
+                for select_row in self.select_rows.iter_range(start_index, end_index):
                     if select_row != highlight_row:
                         self.draw_item_select(
                             cr, offset_x, self.title_offset_y + select_row * self.item_height,
@@ -439,39 +611,28 @@ class ListView(gtk.DrawingArea):
                         cr, offset_x, self.title_offset_y + self.highlight_item.get_index() * self.item_height,
                         viewport.allocation.width, self.item_height)
                     
-                # Get viewport index.
-                start_y = offset_y - self.title_offset_y
-                end_y = offset_y + viewport.allocation.height - self.title_offset_y
-                start_index = max(start_y / self.item_height, 0)
-                if (end_y - end_y / self.item_height * self.item_height) == 0:
-                    end_index = min(end_y / self.item_height + 1, len(self.items))
-                else:
-                    end_index = min(end_y / self.item_height + 2, len(self.items))        
+                # Measure visible items that haven't measured when add items.
+                visible_items = self.items[start_index:end_index]
+                if self.model == None:
+                    self.measure_visible_items_later(visible_items)
                     
                 # Draw list item.
-                for (row, item) in enumerate(self.items[start_index:end_index]):
-                    renders = item.get_renders()
-                    for (column, render) in enumerate(renders):
-                        cell_width = cell_widths[column]
-                        cell_x = sum(cell_widths[0:column])
-                        render_x = rect.x + cell_x
-                        render_y = rect.y + (row + start_index) * self.item_height + self.title_offset_y
-                        render_width = cell_width
-                        render_height = self.item_height
-                        
-                        with cairo_state(cr):
-                            # Don't allowed list item draw out of cell rectangle.
-                            cr.rectangle(render_x, render_y, render_width, render_height)
-                            cr.clip()
-                            
-                            # Render cell.
-                            render(cr, gtk.gdk.Rectangle(render_x, render_y, render_width, render_height),
-                                   (start_index + row) in self.select_rows,
-                                   item == self.highlight_item)
-            
+                for (row, item) in enumerate(visible_items):
+                    render_y = rect.y + (row + start_index) * self.item_height + self.title_offset_y
+                    in_select = (start_index + row) in self.select_rows
+                    in_highlight = item == self.highlight_item
                     
-        # Draw titles.
-        if self.titles:
+                    if self.enable_row_cache:
+                        self.draw_cache_row(cr, item, rect.x, render_y, cell_widths, in_select, in_highlight)
+                    else:
+                        self.draw_row(cr, item, rect.x, render_y, cell_widths, in_select, in_highlight)
+        else:
+            item_image_loader.update_viewport(self, [])
+                    
+        # Draw titles when title area in expose area.
+        if (self.titles 
+            and event.area.y < offset_y + self.title_height 
+            and event.area.y + event.area.height > offset_y):
             for (column, width) in enumerate(cell_widths):
                 # Get offset x coordinate.
                 cell_offset_x = sum(cell_widths[0:column])
@@ -542,6 +703,55 @@ class ListView(gtk.DrawingArea):
             
         return False
     
+    def draw_row(self, cr, item, x, y, cell_widths, in_select, in_highlight):
+        '''Draw cells of row.'''
+        cell_x = x
+        for (column, render) in enumerate(item.get_renders()):
+            cell_width = cell_widths[column]
+            
+            with cairo_state(cr):
+                # Don't allowed list item draw out of cell rectangle.
+                cr.rectangle(cell_x, y, cell_width, self.item_height)
+                cr.clip()
+                
+                # Render cell.
+                render(cr, gtk.gdk.Rectangle(cell_x, y, cell_width, self.item_height),
+                       in_select, in_highlight)
+                
+            cell_x += cell_width
+            
+    def draw_cache_row(self, cr, item, x, y, cell_widths, in_select, in_highlight):
+        '''Draw row with cache surface, render row only when cache miss.'''
+        cache_key = (item, tuple(cell_widths), self.item_height, in_select, in_highlight, ui_theme.get_ticker())
+        surface = self.row_cache.get(cache_key)
+        if surface == None:
+            # Render row on transparent surface.
+            row_width = max(sum(cell_widths), 1)
+            surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, row_width, self.item_height)
+            self.draw_row(cairo.Context(surface), item, 0, 0, cell_widths, in_select, in_highlight)
+            
+            self.row_cache.set(cache_key, surface, row_width * self.item_height * 4)
+            
+        cr.set_source_surface(surface, x, y)
+        cr.paint()
+        
+    def set_row_cache(self, enable_row_cache, row_cache_size=None):
+        '''Enable or disable row render cache, row_cache_size is memory budget in bytes.'''
+        self.enable_row_cache = enable_row_cache
+        if row_cache_size != None:
+            self.row_cache.set_max_size(row_cache_size)
+        if not enable_row_cache:
+            self.row_cache.clear()
+            
+        self.queue_draw()
+        
+    def clear_row_cache(self, item=None):
+        '''Clear row render cache of given item, clear all cache if item is None.'''
+        if item == None:
+            self.row_cache.clear()
+        else:
+            self.row_cache.remove_match(lambda cache_key: cache_key[0] == item)
+        
     def motion_list_view(self, widget, event):
         '''Motion list view.'''
         if self.titles:
@@ -648,11 +858,11 @@ class ListView(gtk.DrawingArea):
                     if hover_row != None and self.start_select_row != None:
                         # Update select area.
                         if hover_row > self.start_select_row:
-                            self.select_rows = range(self.start_select_row, hover_row + 1)
+                            self.select_rows.set_range(self.start_select_row, hover_row + 1)
                         elif hover_row < self.start_select_row:
-                            self.select_rows = range(hover_row, self.start_select_row + 1)
+                            self.select_rows.set_range(hover_row, self.start_select_row + 1)
                         else:
-                            self.select_rows = [hover_row]
+                            self.select_rows.set_rows([hover_row])
                             
                         # Scroll viewport when cursor almost reach bound of viewport.
                         vadjust = get_match_parent(self, ["ScrolledWindow"]).get_vadjustment()
@@ -722,54 +932,39 @@ class ListView(gtk.DrawingArea):
         if self.left_button_press:
             if click_row == None:
                 self.start_select_row = None
-                self.select_rows = []
+                self.select_rows.clear()
             else:
                 if self.press_shift:
-                    if self.select_rows == [] or self.start_select_row == None:
+                    if self.select_rows.is_empty() or self.start_select_row == None:
                         self.start_select_row = click_row
-                        self.select_rows = [click_row]
+                        self.select_rows.set_rows([click_row])
                     else:
                         if len(self.select_rows) == 1:
                             self.start_select_row = self.select_rows[0]
                     
                         if click_row < self.start_select_row:
-                            self.select_rows = range(click_row, self.start_select_row + 1)
+                            self.select_rows.set_range(click_row, self.start_select_row + 1)
                         elif click_row > self.start_select_row:
-                            self.select_rows = range(self.start_select_row, click_row + 1)
+                            self.select_rows.set_range(self.start_select_row, click_row + 1)
                         else:
-                            self.select_rows = [click_row]
+                            self.select_rows.set_rows([click_row])
                 elif self.press_ctrl:
                     if click_row in self.select_rows:
                         self.select_rows.remove(click_row)
                     else:
                         self.start_select_row = click_row
-                        self.select_rows.append(click_row)
-                    self.select_rows = sorted(self.select_rows)
+                        self.select_rows.add(click_row)
                 else:
                     if self.enable_drag_drop and click_row in self.select_rows:
                         self.start_drag = True
                         
-                        if self.start_select_row:
-                            self.start_select_item = self.items[self.start_select_row]
-                            
-                        self.before_drag_items = []
-                        self.after_drag_items = []
-                        
-                        for row in self.select_rows:
-                            if row == click_row:
-                                self.drag_item = self.items[click_row]
-                            elif row < click_row:
-                                self.before_drag_items.append(self.items[row])
-                            elif row > click_row:
-                                self.after_drag_items.append(self.items[row])
-                                
                         # Record press_in_select_rows, disable select rows if mouse not move after release button.
                         self.press_in_select_rows = click_row
                     else:
                         self.start_drag = False
                     
                         self.start_select_row = click_row
-                        self.select_rows = [click_row]
+                        self.select_rows.set_rows([click_row])
                         self.emit_item_event("button-press-item", event)
             
             if is_double_click(event):
@@ -780,12 +975,12 @@ class ListView(gtk.DrawingArea):
             right_press_row = self.get_event_row(event)
             if right_press_row == None:
                 self.start_select_row = None
-                self.select_rows = []
+                self.select_rows.clear()
                 
                 self.queue_draw()
             elif not right_press_row in self.select_rows:
                 self.start_select_row = right_press_row
-                self.select_rows = [right_press_row]
+                self.select_rows.set_rows([right_press_row])
                 
                 self.queue_draw()
                 
@@ -833,16 +1028,19 @@ class ListView(gtk.DrawingArea):
                                 self.title_sorts[column] = not self.title_sorts[column]
                                 self.title_clicks[column] = False
                                 
-                                if len(self.sorts) >= column + 1:
+                                if self.model != None:
+                                    # Rows of model haven't identity, just clear select status after sort.
+                                    self.start_select_row = None
+                                    self.select_rows.clear()
+                                    self.model.sort_rows(column, self.title_sorts[column])
+                                    self.row_cache.clear()
+                                elif len(self.sorts) >= column + 1:
                                     with self.keep_select_status():
                                         # Re-sort.
                                         self.items = sorted(self.items, 
                                                             key=self.sorts[column][0],
                                                             cmp=self.sorts[column][1],
                                                             reverse=self.title_sorts[column])
-                                    
-                                    # Update item index.
-                                    self.update_item_index()    
                                 break
                 elif len(self.items) > 0:
                     self.release_item(event)
@@ -862,39 +1060,21 @@ class ListView(gtk.DrawingArea):
         if self.start_select_row != None:
             start_select_item = self.items[self.start_select_row]
         
-        select_items = []
-        for row in self.select_rows:
-            select_items.append(self.items[row])
+        select_items = map(lambda row: self.items[row], self.select_rows)
             
         try:  
             yield  
         except Exception, e:  
             print 'with an cairo error %s' % e  
         else:  
-            # Restore select status.
-            if start_select_item != None or select_items != []:
-                # Init start select row.
-                if start_select_item != None:
-                    self.start_select_row = None
-                
-                # Init select rows.
-                if select_items != []:
-                    self.select_rows = []
+            # Update item index, then restore select status through new index of items.
+            self.update_item_index()
+            
+            if start_select_item != None:
+                self.start_select_row = start_select_item.get_index()
                 
-                for (index, item) in enumerate(self.items):
-                    # Try restore select row.
-                    if item in select_items:
-                        self.select_rows.append(index)
-                        select_items.remove(item)
-                    
-                    # Try restore start select row.
-                    if item == start_select_item:
-                        self.start_select_row = index
-                        start_select_item = None
-                    
-                    # Stop loop when finish restore row status.
-                    if select_items == [] and start_select_item == None:
-                        break
+            if select_items != []:
+                self.select_rows.set_rows(map(lambda item: item.get_index(), select_items))
         
     def release_item(self, event):
         '''Release row.'''
@@ -917,7 +1097,7 @@ class ListView(gtk.DrawingArea):
             # Disable select rows when press_in_select_rows valid after button release.
             if self.press_in_select_rows:
                 self.start_select_row = self.press_in_select_rows
-                self.select_rows = [self.press_in_select_rows]
+                self.select_rows.set_rows([self.press_in_select_rows])
                 
                 self.press_in_select_rows = None
                 
@@ -937,37 +1117,8 @@ class ListView(gtk.DrawingArea):
         hover_row = min(max(int((event_y - self.title_offset_y) / self.item_height), 0),
                         len(self.items))
         
-        # Filt items around drag item.
-        filter_items = self.before_drag_items + [self.drag_item] + self.after_drag_items
-        
-        before_items = []
-        for item in self.items[0:hover_row]:
-            if not item in filter_items:
-                before_items.append(item)
-            
-        after_items = []
-        for item in self.items[hover_row::]:
-            if not item in filter_items:
-                after_items.append(item)
-                    
-        # Update items order.
-        self.items = before_items + self.before_drag_items + [self.drag_item] + self.after_drag_items + after_items
-        
-        # Update select rows.
-        self.select_rows = range(len(before_items), len(self.items) - len(after_items))
-        
-        # Update select start row.
-        for row in self.select_rows:
-            if self.items[row] == self.start_select_item:
-                self.start_select_row = row
-                break
-            
-        
-        # Update item index.
-        self.update_item_index()    
-        
-        # Redraw.
-        self.queue_draw()
+        # Move select rows to cursor position.
+        self.move_rows(self.select_rows.get_ranges(), hover_row)
                 
     def leave_list_view(self, widget, event):
         '''leave-notify-event signal handler.'''
@@ -1046,7 +1197,7 @@ class ListView(gtk.DrawingArea):
         if len(self.items) > 0:
             # Update select rows.
             self.start_select_row = 0
-            self.select_rows = [0]
+            self.select_rows.set_rows([0])
             
             # Scroll to top.
             vadjust = get_match_parent(self, ["ScrolledWindow"]).get_vadjustment()
@@ -1061,7 +1212,7 @@ class ListView(gtk.DrawingArea):
             # Update select rows.
             last_row = last_index(self.items)
             self.start_select_row = last_row
-            self.select_rows = [last_row]
+            self.select_rows.set_rows([last_row])
             
             # Scroll to bottom.
             vadjust = get_match_parent(self, ["ScrolledWindow"]).get_vadjustment()
@@ -1072,7 +1223,7 @@ class ListView(gtk.DrawingArea):
             
     def scroll_page_up(self):
         '''Scroll page up.'''
-        if self.select_rows == []:
+        if self.select_rows.is_empty():
             # Select row.
             vadjust = get_match_parent(self, ["ScrolledWindow"]).get_vadjustment()
             select_y = max(vadjust.get_value() - vadjust.get_page_size(), self.title_offset_y)
@@ -1080,7 +1231,7 @@ class ListView(gtk.DrawingArea):
             
             # Update select row.
             self.start_select_row = select_row
-            self.select_rows = [select_row]
+            self.select_rows.set_rows([select_row])
             
             # Scroll viewport make sure preview row in visible area.
             (offset_x, offset_y, viewport) = self.get_offset_coordinate(self)
@@ -1103,7 +1254,7 @@ class ListView(gtk.DrawingArea):
                 
                 # Update select row.
                 self.start_select_row = select_row
-                self.select_rows = [select_row]
+                self.select_rows.set_rows([select_row])
                 
                 # Scroll viewport make sure preview row in visible area.
                 (offset_x, offset_y, viewport) = self.get_offset_coordinate(self)
@@ -1120,7 +1271,7 @@ class ListView(gtk.DrawingArea):
             
     def scroll_page_down(self):
         '''Scroll page down.'''
-        if self.select_rows == []:
+        if self.select_rows.is_empty():
             # Select row.
             vadjust = get_match_parent(self, ["ScrolledWindow"]).get_vadjustment()
             select_y = min(vadjust.get_value() + vadjust.get_page_size(),
@@ -1129,7 +1280,7 @@ class ListView(gtk.DrawingArea):
             
             # Update select row.
             self.start_select_row = select_row
-            self.select_rows = [select_row]
+            self.select_rows.set_rows([select_row])
             
             # Scroll viewport make sure preview row in visible area.
             max_y = vadjust.get_upper() - vadjust.get_page_size()
@@ -1152,7 +1303,7 @@ class ListView(gtk.DrawingArea):
                 
                 # Update select row.
                 self.start_select_row = select_row
-                self.select_rows = [select_row]
+                self.select_rows.set_rows([select_row])
                 
                 # Scroll viewport make sure preview row in visible area.
                 max_y = vadjust.get_upper() - vadjust.get_page_size()
@@ -1167,7 +1318,7 @@ class ListView(gtk.DrawingArea):
         
     def select_prev_item(self):
         '''Select preview item.'''
-        if self.select_rows == []:
+        if self.select_rows.is_empty():
             self.select_first_item()
         else:
             # Get preview row.
@@ -1177,7 +1328,7 @@ class ListView(gtk.DrawingArea):
             if prev_row != self.start_select_row:
                 # Select preview row.
                 self.start_select_row = prev_row
-                self.select_rows = [prev_row]
+                self.select_rows.set_rows([prev_row])
                 
                 # Scroll viewport make sure preview row in visible area.
                 (offset_x, offset_y, viewport) = self.get_offset_coordinate(self)
@@ -1193,7 +1344,7 @@ class ListView(gtk.DrawingArea):
             elif len(self.select_rows) > 1:
                 # Select preview row.
                 self.start_select_row = prev_row
-                self.select_rows = [prev_row]
+                self.select_rows.set_rows([prev_row])
                 
                 # Scroll viewport make sure preview row in visible area.
                 (offset_x, offset_y, viewport) = self.get_offset_coordinate(self)
@@ -1206,7 +1357,7 @@ class ListView(gtk.DrawingArea):
         
     def select_next_item(self):
         '''Select next item.'''
-        if self.select_rows == []:
+        if self.select_rows.is_empty():
             self.select_first_item()
         else:
             # Get next row.
@@ -1216,7 +1367,7 @@ class ListView(gtk.DrawingArea):
             if next_row != self.start_select_row:
                 # Select next row.
                 self.start_select_row = next_row
-                self.select_rows = [next_row]
+                self.select_rows.set_rows([next_row])
                 
                 # Scroll viewport make sure next row in visible area.
                 (offset_x, offset_y, viewport) = self.get_offset_coordinate(self)
@@ -1230,7 +1381,7 @@ class ListView(gtk.DrawingArea):
             elif len(self.select_rows) > 1:
                 # Select next row.
                 self.start_select_row = next_row
-                self.select_rows = [next_row]
+                self.select_rows.set_rows([next_row])
                 
                 # Scroll viewport make sure next row in visible area.
                 (offset_x, offset_y, viewport) = self.get_offset_coordinate(self)
@@ -1244,14 +1395,14 @@ class ListView(gtk.DrawingArea):
     
     def select_to_prev_item(self):
         '''Select to preview item.'''
-        if self.select_rows == []:
+        if self.select_rows.is_empty():
             self.select_first_item()
         elif self.start_select_row != None:
             if self.start_select_row == self.select_rows[-1]:
                 first_row = self.select_rows[0]
                 if first_row > 0:
                     prev_row = first_row - 1
-                    self.select_rows = [prev_row] + self.select_rows
+                    self.select_rows.add(prev_row)
                     
                     (offset_x, offset_y, viewport) = self.get_offset_coordinate(self)
                     vadjust = get_match_parent(self, ["ScrolledWindow"]).get_vadjustment()
@@ -1275,14 +1426,14 @@ class ListView(gtk.DrawingArea):
     
     def select_to_next_item(self):
         '''Select to next item.'''
-        if self.select_rows == []:
+        if self.select_rows.is_empty():
             self.select_first_item()
         elif self.start_select_row != None:
             if self.start_select_row == self.select_rows[0]:
                 last_row = self.select_rows[-1]
                 if last_row < last_index(self.items):
                     next_row = last_row + 1
-                    self.select_rows.append(next_row)
+                    self.select_rows.add(next_row)
                     
                     (offset_x, offset_y, viewport) = self.get_offset_coordinate(self)
                     vadjust = get_match_parent(self, ["ScrolledWindow"]).get_vadjustment()
@@ -1307,16 +1458,16 @@ class ListView(gtk.DrawingArea):
     
     def select_to_first_item(self):
         '''Select to first item.'''
-        if self.select_rows == []:
+        if self.select_rows.is_empty():
             self.select_first_item()
         elif self.start_select_row != None:
             if self.start_select_row == self.select_rows[-1]:
-                self.select_rows = range(0, self.select_rows[-1] + 1)
+                self.select_rows.set_range(0, self.select_rows[-1] + 1)
                 vadjust = get_match_parent(self, ["ScrolledWindow"]).get_vadjustment()
                 vadjust.set_value(vadjust.get_lower())
                 self.queue_draw()
             elif self.start_select_row == self.select_rows[0]:
-                self.select_rows = range(0, self.select_rows[0] + 1)
+                self.select_rows.set_range(0, self.select_rows[0] + 1)
                 vadjust = get_match_parent(self, ["ScrolledWindow"]).get_vadjustment()
                 vadjust.set_value(vadjust.get_lower())
                 self.queue_draw()
@@ -1325,16 +1476,16 @@ class ListView(gtk.DrawingArea):
     
     def select_to_last_item(self):
         '''Select to last item.'''
-        if self.select_rows == []:
+        if self.select_rows.is_empty():
             self.select_first_item()
         elif self.start_select_row != None:
             if self.start_select_row == self.select_rows[0]:
-                self.select_rows = range(self.select_rows[0], len(self.items))
+                self.select_rows.set_range(self.select_rows[0], len(self.items))
                 vadjust = get_match_parent(self, ["ScrolledWindow"]).get_vadjustment()
                 vadjust.set_value(vadjust.get_upper() - vadjust.get_page_size())
                 self.queue_draw()
             elif self.start_select_row == self.select_rows[-1]:
-                self.select_rows = range(self.select_rows[-1], len(self.items))
+                self.select_rows.set_range(self.select_rows[-1], len(self.items))
                 vadjust = get_match_parent(self, ["ScrolledWindow"]).get_vadjustment()
                 vadjust.set_value(vadjust.get_upper() - vadjust.get_page_size())
                 self.queue_draw()
@@ -1343,39 +1494,83 @@ class ListView(gtk.DrawingArea):
     
     def select_all_items(self):
         '''Select all items.'''
-        if self.select_rows == []:
+        if self.select_rows.is_empty():
             self.start_select_row = 0
-            self.select_rows = range(0, len(self.items))            
+            self.select_rows.select_all(len(self.items))
         
             self.queue_draw()
         else:
-            self.select_rows = range(0, len(self.items))            
+            self.select_rows.select_all(len(self.items))
         
             self.queue_draw()
             
+    def invert_select_items(self):
+        '''Invert select items.'''
+        self.select_rows.invert(len(self.items))
+        if self.start_select_row != None and not self.start_select_row in self.select_rows:
+            if self.select_rows.is_empty():
+                self.start_select_row = None
+            else:
+                self.start_select_row = self.select_rows[0]
+        
+        self.queue_draw()
+            
     def delete_select_items(self):
         '''Delete select items.'''
-        # Get select items.
-        remove_items = []
-        for row in self.select_rows:
-            remove_items.append(self.items[row])
-            
-        if remove_items != []:
-            # Init select row.
-            self.start_select_row = None
-            self.select_rows = []
-            cache_remove_items = []
-            
-            # Remove select items.
-            for remove_item in remove_items:
-                cache_remove_items.append(remove_item)
-                self.items.remove(remove_item)
+        self.remove_rows(self.select_rows.get_ranges())
+        
+    def remove_rows(self, ranges):
+        '''
+        Remove rows in given ranges, ranges is list of (start, end).
+        
+        All rows remove in one pass, and emit `delete-select-items` signal once.
+        '''
+        # Merge ranges.
+        remove_selection = RowSelection()
+        for (start, end) in ranges:
+            remove_selection.select_range(max(start, 0), min(end, len(self.items)))
+            
+        if not remove_selection.is_empty():
+            # Remove rows.
+            if self.model != None:
+                remove_items = map(self.model.get_row_data, remove_selection)
+                
+                # Keep view status if model don't support remove rows.
+                if not self.model.remove_rows(remove_selection.get_ranges()):
+                    return
+            else:
+                remove_items = []
+                keep_items = []
+                keep_start = 0
+                for (start, end) in remove_selection.get_ranges():
+                    keep_items += self.items[keep_start:start]
+                    remove_items += self.items[start:end]
+                    keep_start = end
+                keep_items += self.items[keep_start::]
+                self.items = keep_items
+            self.row_cache.clear()
+            
+            # Update select status.
+            self.select_rows.remove_selection(remove_selection)
+            if self.start_select_row != None:
+                if self.start_select_row in remove_selection:
+                    self.start_select_row = None
+                else:
+                    self.start_select_row -= remove_selection.count_before(self.start_select_row)
+                    
+            if self.highlight_item != None:
+                highlight_row = self.highlight_item.get_index()
+                if highlight_row in remove_selection:
+                    self.highlight_item = None
+                elif self.model != None:
+                    self.highlight_item.set_index(highlight_row - remove_selection.count_before(highlight_row))
+            self.hover_row = None
                 
             # Emit remove items signal.     
-            self.emit("delete-select-items", cache_remove_items)    
+            self.emit("delete-select-items", remove_items)    
                 
-            # Update item index.
-            self.update_item_index()    
+            # Update index of items after first remove row.
+            self.update_item_index(remove_selection[0])
             
             # Update vertical adjustment.
             self.update_vadjustment()        
@@ -1383,6 +1578,54 @@ class ListView(gtk.DrawingArea):
             # Redraw.
             self.queue_draw()
             
+    def move_rows(self, ranges, target_row):
+        '''
+        Move rows in given ranges to target row, ranges is list of (start, end).
+        
+        Target row is row index before move, moved rows will select after move.
+        '''
+        # Merge ranges.
+        move_selection = RowSelection()
+        for (start, end) in ranges:
+            move_selection.select_range(max(start, 0), min(end, len(self.items)))
+        target_row = min(max(target_row, 0), len(self.items))
+        
+        if not move_selection.is_empty():
+            # Move rows.
+            before_count = target_row - move_selection.count_before(target_row)
+            if self.model != None:
+                # Keep view status if model don't support move rows.
+                if not self.model.move_rows(move_selection.get_ranges(), target_row):
+                    return
+                self.row_cache.clear()
+            else:
+                before_items = []
+                move_items = []
+                after_items = []
+                keep_start = 0
+                for (start, end) in move_selection.get_ranges() + [(len(self.items), len(self.items))]:
+                    before_items += self.items[keep_start:max(min(start, target_row), keep_start)]
+                    after_items += self.items[max(keep_start, target_row):start]
+                    move_items += self.items[start:end]
+                    keep_start = end
+                self.items = before_items + move_items + after_items
+                
+            # Update select status.
+            get_move_row = lambda row: move_selection.get_move_row(row, target_row)
+            if self.start_select_row != None:
+                self.start_select_row = get_move_row(self.start_select_row)
+            if self.highlight_item != None and self.model != None:
+                self.highlight_item.set_index(get_move_row(self.highlight_item.get_index()))
+            self.select_rows.set_range(before_count, before_count + len(move_selection))
+            self.hover_row = None
+            
+            # Update index of items between first and last change row.
+            self.update_item_index(min(move_selection[0], target_row),
+                                   max(move_selection[-1] + 1, target_row))
+        
+            # Redraw.
+            self.queue_draw()
+            
     def update_vadjustment(self):
         '''Update vertical adjustment.'''
         list_height = self.title_offset_y + len(self.items) * self.item_height
@@ -1401,8 +1644,10 @@ class ListView(gtk.DrawingArea):
         '''Clear all list.'''
         # Clear list.
         self.start_select_row = None
-        self.select_rows = []
+        self.select_rows.clear()
         self.items = []
+        self.model = None
+        self.row_cache.clear()
         
         # Update vertical adjustment.
         self.update_vadjustment()
@@ -1478,19 +1723,29 @@ class ListItem(gobject.GObject):
         self.artist = artist
         self.length = length
         
-        # Calculate item size.
+        # Init item padding, item size will calculate when list view need it.
         self.title_padding_x = 10
         self.title_padding_y = 5
-        (self.title_width, self.title_height) = get_content_size(self.title, DEFAULT_FONT_SIZE)
-        
         self.artist_padding_x = 10
         self.artist_padding_y = 5
-        (self.artist_width, self.artist_height) = get_content_size(self.artist, DEFAULT_FONT_SIZE)
-
         self.length_padding_x = 10
         self.length_padding_y = 5
+        self.column_sizes = None
+        
+    def measure(self):
+        '''Calculate item size.'''
+        (self.title_width, self.title_height) = get_content_size(self.title, DEFAULT_FONT_SIZE)
+        (self.artist_width, self.artist_height) = get_content_size(self.artist, DEFAULT_FONT_SIZE)
         (self.length_width, self.length_height) = get_content_size(self.length, DEFAULT_FONT_SIZE)
         
+        self.column_sizes = [(self.title_width + self.title_padding_x * 2,
+                              self.title_height + self.title_padding_y * 2),
+                             (self.artist_width + self.artist_padding_x * 2, 
+                              self.artist_height + self.artist_padding_y * 2),
+                             (self.length_width + self.length_padding_x * 2, 
+                              self.length_height + self.length_padding_y * 2),
+                             ]
+        
     def render_title(self, cr, rect, in_select, in_highlight):
         '''Render title.'''
         rect.x += self.title_padding_x
@@ -1510,13 +1765,10 @@ class ListItem(gobject.GObject):
         
     def get_column_sizes(self):
         '''Get sizes.'''
-        return [(self.title_width + self.title_padding_x * 2,
-                 self.title_height + self.title_padding_y * 2),
-                (self.artist_width + self.artist_padding_x * 2, 
-                 self.artist_height + self.artist_padding_y * 2),
-                (self.length_width + self.length_padding_x * 2, 
-                 self.length_height + self.length_padding_y * 2),
-                ]    
+        if self.column_sizes == None:
+            self.measure()
+            
+        return self.column_sizes
     
     def get_renders(self):
         '''Get render callbacks.'''
@@ -1524,6 +1776,315 @@ class ListItem(gobject.GObject):
                 self.render_artist,
                 self.render_length]
     
+class ListModel(object):
+    '''
+    Data source of list view in virtual mode.
+    
+    Base class is an empty model, subclass override get_row_count, get_column_sizes and get_row_renders,
+    list view only call get_row_renders for rows in visible area,
+    so model can keep million rows in any compact structure it like.
+    '''
+    
+    def get_row_count(self):
+        '''Get row count, default is empty model.'''
+        return 0
+    
+    def get_column_sizes(self):
+        '''Get minimum sizes of columns, return list of (width, height), same as ListItem.get_column_sizes, default no column.'''
+        return []
+    
+    def get_row_renders(self, row):
+        '''Get render callbacks of given row, same as ListItem.get_renders, default no render.'''
+        return []
+    
+    def get_row_data(self, row):
+        '''Get data of given row, default return row index.'''
+        return row
+    
+    def sort_rows(self, column, reverse):
+        '''Sort rows with given column, call when user click title.'''
+        pass
+    
+    def remove_rows(self, ranges):
+        '''Remove rows in given ranges, ranges is sorted disjoint list of (start, end), return True if rows removed, default not support.'''
+        return False
+    
+    def move_rows(self, ranges, target_row):
+        '''Move rows in given ranges to target row (row index before move), keep order of moved rows, return True if rows moved, default not support.'''
+        return False
+    
+class ListModelRow(object):
+    '''Lightweight row proxy of ListModel, only create when list view access it.'''
+    
+    __slots__ = ("model", "index")
+    
+    def __init__(self, model, index):
+        '''Init list model row.'''
+        self.model = model
+        self.index = index
+        
+    def __eq__(self, other):
+        return isinstance(other, ListModelRow) and self.model is other.model and self.index == other.index
+    
+    def __ne__(self, other):
+        return not self.__eq__(other)
+    
+    def __hash__(self):
+        return hash((id(self.model), self.index))
+        
+    def set_index(self, index):
+        '''Update index.'''
+        self.index = index
+        
+    def get_index(self):
+        '''Get index.'''
+        return self.index
+    
+    def get_data(self):
+        '''Get row data.'''
+        return self.model.get_row_data(self.index)
+    
+    def get_renders(self):
+        '''Get render callbacks.'''
+        return self.model.get_row_renders(self.index)
+    
+class ListModelItems(object):
+    '''Sequence wrap ListModel as `items` of list view, row proxy create on demand.'''
+    
+    def __init__(self, model):
+        '''Init list model items.'''
+        self.model = model
+        
+    def __len__(self):
+        return self.model.get_row_count()
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return map(lambda row: ListModelRow(self.model, row), 
+                       range(*index.indices(len(self))))
+        else:
+            row_count = len(self)
+            if index < 0:
+                index += row_count
+            if not 0 <= index < row_count:
+                raise IndexError("list model row out of range")
+            
+            return ListModelRow(self.model, index)
+        
+    def __iter__(self):
+        for row in xrange(len(self)):
+            yield ListModelRow(self.model, row)
+    
+class RowSelection(object):
+    '''
+    Select rows of list view.
+    
+    Rows store as sorted disjoint ranges [start, end),
+    so select all or select range just need one range,
+    and membership test is O(log n) with binary search.
+    '''
+    
+    def __init__(self, rows=[]):
+        '''Init row selection.'''
+        self.starts = []
+        self.ends = []
+        self.row_count = 0
+        self.set_rows(rows)
+        
+    def __len__(self):
+        return self.row_count
+    
+    def __contains__(self, row):
+        index = bisect_right(self.starts, row) - 1
+        return index >= 0 and row < self.ends[index]
+    
+    def __iter__(self):
+        for (start, end) in zip(self.starts, self.ends):
+            for row in xrange(start, end):
+                yield row
+                
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.row_count
+        if not 0 <= index < self.row_count:
+            raise IndexError("row selection index out of range")
+        
+        if index == 0:
+            return self.starts[0]
+        elif index == self.row_count - 1:
+            return self.ends[-1] - 1
+        else:
+            for (start, end) in zip(self.starts, self.ends):
+                if index < end - start:
+                    return start + index
+                else:
+                    index -= end - start
+                
+    def __repr__(self):
+        return "RowSelection(%s)" % (self.get_ranges())
+                
+    def is_empty(self):
+        '''Whether no row selected.'''
+        return self.row_count == 0
+    
+    def get_ranges(self):
+        '''Get select ranges, return list of (start, end).'''
+        return zip(self.starts, self.ends)
+    
+    def iter_range(self, start, end):
+        '''Iterate select rows between [start, end).'''
+        index = max(bisect_right(self.starts, start) - 1, 0)
+        while index < len(self.starts) and self.starts[index] < end:
+            for row in xrange(max(self.starts[index], start), min(self.ends[index], end)):
+                yield row
+            index += 1
+    
+    def clear(self):
+        '''Clear selection.'''
+        self.starts = []
+        self.ends = []
+        self.row_count = 0
+        
+    def set_rows(self, rows):
+        '''Select given rows only.'''
+        self.clear()
+        for row in sorted(rows):
+            if self.ends != [] and row <= self.ends[-1]:
+                if row == self.ends[-1]:
+                    self.ends[-1] += 1
+                    self.row_count += 1
+            else:
+                self.starts.append(row)
+                self.ends.append(row + 1)
+                self.row_count += 1
+            
+    def set_range(self, start, end):
+        '''Select rows between [start, end) only.'''
+        self.clear()
+        self.select_range(start, end)
+        
+    def select_range(self, start, end):
+        '''Add rows between [start, end) to selection.'''
+        if start < end:
+            # Merge all ranges overlap or adjacent with new range.
+            first_index = bisect_left(self.ends, start)
+            last_index = bisect_right(self.starts, end)
+            if first_index < last_index:
+                start = min(start, self.starts[first_index])
+                end = max(end, self.ends[last_index - 1])
+                
+            self.replace_ranges(first_index, last_index, [(start, end)])
+            
+    def unselect_range(self, start, end):
+        '''Remove rows between [start, end) from selection.'''
+        if start < end:
+            # Keep parts of ranges out of [start, end).
+            first_index = bisect_right(self.ends, start)
+            last_index = bisect_left(self.starts, end)
+            if first_index < last_index:
+                ranges = []
+                if self.starts[first_index] < start:
+                    ranges.append((self.starts[first_index], start))
+                if self.ends[last_index - 1] > end:
+                    ranges.append((end, self.ends[last_index - 1]))
+                    
+                self.replace_ranges(first_index, last_index, ranges)
+                
+    def replace_ranges(self, first_index, last_index, ranges):
+        '''Replace ranges between [first_index, last_index) with given ranges.'''
+        for index in range(first_index, last_index):
+            self.row_count -= self.ends[index] - self.starts[index]
+        for (start, end) in ranges:
+            self.row_count += end - start
+            
+        self.starts[first_index:last_index] = map(lambda (start, end): start, ranges)
+        self.ends[first_index:last_index] = map(lambda (start, end): end, ranges)
+            
+    def add(self, row):
+        '''Add row to selection.'''
+        self.select_range(row, row + 1)
+        
+    def remove(self, row):
+        '''Remove row from selection.'''
+        self.unselect_range(row, row + 1)
+        
+    def select_all(self, row_count):
+        '''Select all rows.'''
+        self.set_range(0, row_count)
+        
+    def invert(self, row_count):
+        '''Invert selection in rows between [0, row_count).'''
+        self.truncate(row_count)
+        
+        ranges = []
+        prev_end = 0
+        for (start, end) in zip(self.starts, self.ends):
+            if prev_end < start:
+                ranges.append((prev_end, start))
+            prev_end = end
+        if prev_end < row_count:
+            ranges.append((prev_end, row_count))
+            
+        self.clear()
+        self.replace_ranges(0, 0, ranges)
+        
+    def count_before(self, row):
+        '''Get count of select rows less than given row.'''
+        count = 0
+        for (start, end) in zip(self.starts, self.ends):
+            if start >= row:
+                break
+            count += min(end, row) - start
+            
+        return count
+    
+    def get_move_row(self, row, target_row):
+        '''Get new index of row after select rows move to target row.'''
+        if row in self:
+            return target_row - self.count_before(target_row) + self.count_before(row)
+        elif row < target_row:
+            return row - self.count_before(row)
+        else:
+            return row + self.row_count - self.count_before(row)
+    
+    def remove_selection(self, remove_selection):
+        '''Update selection after rows in remove_selection removed from list.'''
+        ranges = []
+        remove_count = 0
+        remove_index = 0
+        remove_ranges = remove_selection.get_ranges()
+        for (start, end) in zip(self.starts, self.ends):
+            row = start
+            while row < end:
+                # Skip remove ranges before current row.
+                while remove_index < len(remove_ranges) and remove_ranges[remove_index][1] <= row:
+                    remove_count += remove_ranges[remove_index][1] - remove_ranges[remove_index][0]
+                    remove_index += 1
+                    
+                if remove_index < len(remove_ranges) and remove_ranges[remove_index][0] <= row:
+                    # Jump over remove range.
+                    row = remove_ranges[remove_index][1]
+                else:
+                    # Keep rows until next remove range, and shift them.
+                    if remove_index < len(remove_ranges):
+                        keep_end = min(end, remove_ranges[remove_index][0])
+                    else:
+                        keep_end = end
+                        
+                    if ranges != [] and ranges[-1][1] == row - remove_count:
+                        ranges[-1] = (ranges[-1][0], keep_end - remove_count)
+                    else:
+                        ranges.append((row - remove_count, keep_end - remove_count))
+                    row = keep_end
+                    
+        self.clear()
+        self.replace_ranges(0, 0, ranges)
+        
+    def truncate(self, row_count):
+        '''Remove rows not less than row_count from selection.'''
+        if self.row_count > 0:
+            self.unselect_range(row_count, max(row_count, self.ends[-1]))
+    
 def render_text(cr, rect, content, in_select, in_highlight, align=ALIGN_START, font_size=DEFAULT_FONT_SIZE):
     '''Render text.'''
     if in_select or in_highlight:
@@ -0,0 +1,86 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2011 ~ 2012 Deepin, Inc.
+#               2011 ~ 2012 Wang Yong
+# 
+# Author:     Wang Yong <lazycat.manatee@gmail.com>
+# Maintainer: Wang Yong <lazycat.manatee@gmail.com>
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from collections import OrderedDict
+
+class LRUCache(object):
+    '''
+    LRU cache with size budget.
+    
+    Every value has size (default is 1), 
+    least recently used values will evict when total size exceed max_size.
+    '''
+    
+    def __init__(self, max_size):
+        '''Init LRU cache.'''
+        self.max_size = max_size
+        self.total_size = 0
+        self.cache_dict = OrderedDict()
+        
+    def __len__(self):
+        return len(self.cache_dict)
+    
+    def __contains__(self, key):
+        return key in self.cache_dict
+        
+    def get(self, key, default=None):
+        '''Get value of key, and mark it as recently used.'''
+        if key in self.cache_dict:
+            (value, size) = self.cache_dict.pop(key)
+            self.cache_dict[key] = (value, size)
+            return value
+        else:
+            return default
+        
+    def set(self, key, value, size=1):
+        '''Set value of key, evict least recently used values if out of budget.'''
+        self.remove(key)
+        
+        self.cache_dict[key] = (value, size)
+        self.total_size += size
+        
+        while self.total_size > self.max_size and len(self.cache_dict) > 1:
+            (_, (_, evict_size)) = self.cache_dict.popitem(last=False)
+            self.total_size -= evict_size
+            
+    def remove(self, key):
+        '''Remove key.'''
+        if key in self.cache_dict:
+            (_, size) = self.cache_dict.pop(key)
+            self.total_size -= size
+            
+    def remove_match(self, match_callback):
+        '''Remove all keys that match_callback return True.'''
+        for key in filter(match_callback, self.cache_dict.keys()):
+            self.remove(key)
+            
+    def set_max_size(self, max_size):
+        '''Set max size, evict values if out of budget.'''
+        self.max_size = max_size
+        while self.total_size > self.max_size and len(self.cache_dict) > 0:
+            (_, (_, evict_size)) = self.cache_dict.popitem(last=False)
+            self.total_size -= evict_size
+            
+    def clear(self):
+        '''Clear cache.'''
+        self.cache_dict.clear()
+        self.total_size = 0
@@ -0,0 +1,74 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2011 ~ 2012 Deepin, Inc.
+#               2011 ~ 2012 Wang Yong
+# 
+# Author:     Wang Yong <lazycat.manatee@gmail.com>
+# Maintainer: Wang Yong <lazycat.manatee@gmail.com>
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import gobject
+
+class RedrawScheduler(object):
+    '''
+    Redraw scheduler use to coalesce redraw requests of all widgets.
+    
+    Timeout just add when widget request redraw, 
+    and widgets that request redraw in same delay will update in one timeout,
+    scheduler won't wake up main loop when nothing to redraw.
+    '''
+    
+    def __init__(self, redraw_delay=100):
+        '''Init redraw scheduler.'''
+        self.redraw_delay = redraw_delay # 100 milliseconds should be enough for redraw
+        self.redraw_widgets = []
+        self.redraw_timeout_id = None
+        
+    def add_widget(self, widget):
+        '''
+        Add widget need redraw.
+        
+        Widget must implement method `update_redraw_request_list`, 
+        it will call once when timeout, even widget add many times.
+        '''
+        if not widget in self.redraw_widgets:
+            self.redraw_widgets.append(widget)
+            
+        if self.redraw_timeout_id == None:
+            self.redraw_timeout_id = gobject.timeout_add(self.redraw_delay, self.update_redraw_widgets)
+            
+    def remove_widget(self, widget):
+        '''Remove widget from redraw list, such as widget destroy.'''
+        if widget in self.redraw_widgets:
+            self.redraw_widgets.remove(widget)
+            
+    def update_redraw_widgets(self):
+        '''Update redraw widgets.'''
+        # Swap redraw list first, widget may request redraw again when update.
+        redraw_widgets = self.redraw_widgets
+        self.redraw_widgets = []
+        self.redraw_timeout_id = None
+        
+        for widget in redraw_widgets:
+            try:
+                widget.update_redraw_request_list()
+            except Exception, e:
+                print "update_redraw_widgets got error: %s" % (e)
+                
+        # Don't repeat, timeout will add again when next request.
+        return False
+    
+redraw_scheduler = RedrawScheduler()
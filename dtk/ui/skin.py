@@ -34,15 +34,17 @@ from locales import _
 from scrolled_window import ScrolledWindow
 from skin_config import skin_config
 from theme import ui_theme
-from threads import post_gui
+from thread_pool import MissionWorkerPool
 import tooltip as Tooltip
 import gobject
 import gtk
 import math
+import multiprocessing
 import os
 import shutil
 import tarfile
 import threading as td
+import time
 import urllib
 import uuid
 from utils import (is_in_rect, set_cursor, remove_timeout_id,
@@ -52,29 +54,255 @@ from utils import (is_in_rect, set_cursor, remove_timeout_id,
                    place_center, get_pixbuf_support_foramts, find_similar_color, 
                    get_optimum_pixbuf_from_file)
 
+def get_skin_thumbnail(filepath, width, height):
+    '''Get thumbnail of skin background.'''
+    return get_optimum_pixbuf_from_file(filepath, width, height, False)
+
+IMPORT_SKIN_VERSION_MISMATCH = "version mismatch"
+IMPORT_SKIN_UNSUPPORT_FORMAT = "unsupport format"
+
+def import_skin_from_image(filepath, user_skin_dir, app_id, app_version):
+    '''Import skin from image, return new skin directory.'''
+    # Init.
+    skin_dir = os.path.join(user_skin_dir, str(uuid.uuid4()))
+    skin_image_file = os.path.basename(filepath)
+    config_file = os.path.join(skin_dir, "config.ini")
+    dominant_color = get_dominant_color(filepath)
+    similar_color = find_similar_color(dominant_color)[0]
+    default_config = [
+        ("theme", [("theme_name", similar_color)]),
+        ("application", [("app_id", app_id),
+                         ("app_version", app_version)]),
+        ("background", [("image", skin_image_file),
+                        ("x", "0"),
+                        ("y", "0"),
+                        ("scale_x", "1.0"),
+                        ("scale_y", "1.0"),
+                        ("dominant_color", dominant_color)]),
+        ("action", [("deletable", "True"),
+                    ("editable", "True"),
+                    ("vertical_mirror", "False"),
+                    ("horizontal_mirror", "False")])]
+    
+    # Create skin directory.
+    create_directory(skin_dir, True)
+    
+    # Copy skin image file.
+    shutil.copy(filepath, skin_dir)        
+    
+    # Touch skin config file.
+    touch_file(config_file)
+    
+    # Write default skin config information.
+    Config(config_file, default_config).write()
+    
+    return skin_dir
+
+def extract_skin_package(filepath, user_skin_dir, app_id, app_version):
+    '''
+    Extract skin package to new skin directory, return (skin_dir, theme_name), or None if skin version mismatch.
+    
+    theme_name is None if package use standard theme, otherwise need install theme with install_skin_theme.
+    '''
+    # Init.
+    skin_dir = os.path.join(user_skin_dir, str(uuid.uuid4()))
+    
+    # Create skin directory.
+    create_directory(skin_dir, True)
+    
+    # Extract skin package.
+    tar = tarfile.open(filepath, "r:gz")
+    tar.extractall(skin_dir)
+    
+    # Get skin image file.
+    config = Config(os.path.join(skin_dir, "config.ini"))
+    config.load()
+    
+    # Need install theme files if theme is not in default theme list.
+    skin_theme_name = config.get("theme", "theme_name")
+    if skin_theme_name in COLOR_SEQUENCE:
+        return (skin_dir, None)
+    # Check version when package have special theme that not include in standard themes.
+    elif config.get("application", "app_id") == app_id and config.get("application", "app_version") == app_version:
+        return (skin_dir, skin_theme_name)
+    else:
+        # Remove skin directory if version mismatch.
+        remove_directory(skin_dir)
+        
+        return None
+    
+def install_skin_theme(skin_dir, theme_name, ui_theme_dir, app_theme_dir):
+    '''Move theme files of extracted skin package to given directories, don't call it parallel.'''
+    # Remove same theme from given directories.
+    remove_directory(os.path.join(ui_theme_dir, theme_name))
+    remove_directory(os.path.join(app_theme_dir, theme_name))
+    
+    # Move new theme files to given directories.
+    shutil.move(os.path.join(skin_dir, "ui_theme", theme_name), ui_theme_dir)
+    shutil.move(os.path.join(skin_dir, "app_theme", theme_name), app_theme_dir)
+    
+    # Remove temp theme directories under skin directory.
+    remove_directory(os.path.join(skin_dir, "ui_theme"))        
+    remove_directory(os.path.join(skin_dir, "app_theme"))        
+
+def import_skin_from_package(filepath, user_skin_dir, app_id, app_version, ui_theme_dir, app_theme_dir):
+    '''Import skin from package, return new skin directory, or None if skin version mismatch.'''
+    extract_result = extract_skin_package(filepath, user_skin_dir, app_id, app_version)
+    if extract_result == None:
+        return None
+    
+    (skin_dir, theme_name) = extract_result
+    if theme_name != None:
+        install_skin_theme(skin_dir, theme_name, ui_theme_dir, app_theme_dir)
+        
+    return skin_dir    
+
+def import_skin_file(filepath, user_skin_dir, app_id, app_version):
+    '''
+    Import skin file in worker thread, return (filepath, skin_dir, theme_name, error).
+    
+    Theme of skin package is not install here, caller need install it with install_skin_theme one by one.
+    '''
+    try:
+        theme_name = None
+        if end_with_suffixs(filepath, get_pixbuf_support_foramts()):
+            skin_dir = import_skin_from_image(filepath, user_skin_dir, app_id, app_version)
+        elif end_with_suffixs(filepath, ["tar.gz"]):
+            extract_result = extract_skin_package(filepath, user_skin_dir, app_id, app_version)
+            if extract_result == None:
+                return (filepath, None, None, IMPORT_SKIN_VERSION_MISMATCH)
+            (skin_dir, theme_name) = extract_result
+        else:
+            return (filepath, None, None, IMPORT_SKIN_UNSUPPORT_FORMAT)
+        
+        # Decode thumbnail in worker thread, preview icon will load it from cache.
+        config = Config(os.path.join(skin_dir, "config.ini"))
+        config.load()
+        get_skin_thumbnail(
+            os.path.join(skin_dir, config.get("background", "image")),
+            SkinPreviewIcon.PREVIEW_WIDTH, 
+            SkinPreviewIcon.PREVIEW_HEIGHT)
+        
+        return (filepath, skin_dir, theme_name, None)
+    except Exception, e:
+        return (filepath, None, None, str(e))
+
+class ImportSkinThread(td.Thread):
+    '''
+    Import skin thread, decode and extract skin files in worker threads and send results to main loop.
+    
+    Themes of skin packages are install in this thread one by one,
+    avoid packages with same theme name race in theme directories.
+    '''
+    
+    def __init__(self, filepaths, skin_info, finish_callback, progress_callback=None, thread_num=None):
+        '''Init import skin thread, thread_num is cpu count if it's None.'''
+        td.Thread.__init__(self)
+        self.setDaemon(True) # make thread exit when main program exit
+        
+        self.filepaths = filepaths
+        self.skin_info = skin_info
+        self.finish_callback = finish_callback
+        self.progress_callback = progress_callback
+        self.thread_num = thread_num
+        
+    def run(self):
+        '''Run.'''
+        (user_skin_dir, app_id, app_version, ui_theme_dir, app_theme_dir) = self.skin_info
+        
+        # Pixbuf decode and tarfile release GIL, so worker threads is enough.
+        if self.thread_num == None:
+            pool = MissionWorkerPool(multiprocessing.cpu_count())
+        else:
+            pool = MissionWorkerPool(self.thread_num)
+            
+        import_results = []
+        try:
+            futures = pool.add_missions(
+                [lambda filepath=filepath: import_skin_file(filepath, user_skin_dir, app_id, app_version)
+                 for filepath in self.filepaths])
+            for future in futures:
+                (filepath, skin_dir, theme_name, error) = future.get_result()
+                
+                # Install theme serially.
+                if theme_name != None:
+                    try:
+                        install_skin_theme(skin_dir, theme_name, ui_theme_dir, app_theme_dir)
+                    except Exception, e:
+                        remove_directory(skin_dir)
+                        (skin_dir, error) = (None, str(e))
+                        
+                import_results.append((filepath, skin_dir, error))
+                if self.progress_callback:
+                    gobject.idle_add(self.progress_callback, len(import_results), len(self.filepaths))
+        finally:
+            pool.stop()
+        
+        gobject.idle_add(self.finish_callback, import_results)
+        
 class LoadSkinThread(td.Thread):
-    '''Load skin thread.'''
+    '''Load skin thread, scan skin backgrounds in background and send them to main loop in batches.'''
 	
-    def __init__(self, skin_dirs, add_skin_icon, add_add_icon):
+    def __init__(self, skin_dirs, add_skin_icons, add_add_icon, 
+                 batch_size=8, batch_interval=0.1):
         '''Init load skin thread.'''
         td.Thread.__init__(self)
         self.setDaemon(True) # make thread exit when main program exit
         
         self.skin_dirs = skin_dirs
-        self.add_skin_icon = add_skin_icon
+        self.add_skin_icons = add_skin_icons
         self.add_add_icon = add_add_icon
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval # seconds
+        self.cancel_event = td.Event()
+        
+    def cancel(self):
+        '''Cancel load, skins haven't send to main loop will drop.'''
+        self.cancel_event.set()
+        
+    def is_cancelled(self):
+        '''Is load cancelled.'''
+        return self.cancel_event.isSet()
         
     def run(self):
         '''Run.'''
         support_foramts = get_pixbuf_support_foramts()
+        skin_infos = []
+        batch_time = time.time()
         for skin_dir in self.skin_dirs:
             for root, dirs, files in os.walk(skin_dir):
                 dirs.sort()         # sort directory with alpha order
                 for filename in files:
+                    if self.is_cancelled():
+                        return
+                    
                     if end_with_suffixs(filename, support_foramts):
-                        self.add_skin_icon(root, filename)
-
-        self.add_add_icon()                
+                        # Thumbnail load by item_image_loader when icon scroll into viewport.
+                        skin_infos.append((root, filename))
+                        
+                        # Send batch to main loop when batch is full or wait too long.
+                        if len(skin_infos) >= self.batch_size or time.time() - batch_time >= self.batch_interval:
+                            gobject.idle_add(self.deliver_skin_icons, skin_infos)
+                            skin_infos = []
+                            batch_time = time.time()
+        
+        if len(skin_infos) > 0:
+            gobject.idle_add(self.deliver_skin_icons, skin_infos)
+        gobject.idle_add(self.deliver_add_icon)
+        
+    def deliver_skin_icons(self, skin_infos):
+        '''Deliver skin icons in main loop.'''
+        if not self.is_cancelled():
+            self.add_skin_icons(skin_infos)
+            
+        return False    
+    
+    def deliver_add_icon(self):
+        '''Deliver add icon in main loop.'''
+        if not self.is_cancelled():
+            self.add_add_icon()
+            
+        return False    
 
 class SkinWindow(DialogBox):
     '''SkinWindow.'''
@@ -143,9 +371,12 @@ class SkinPreviewPage(gtk.VBox):
         self.preview_scrolled_window.add_child(self.preview_view)
         self.pack_start(self.preview_align, True, True)
         
-        LoadSkinThread([skin_config.system_skin_dir, skin_config.user_skin_dir],
-                       self.add_skin_icon,
-                       self.add_add_icon).start()
+        self.load_skin_thread = LoadSkinThread(
+            [skin_config.system_skin_dir, skin_config.user_skin_dir],
+            self.add_skin_icons,
+            self.add_add_icon)
+        self.load_skin_thread.start()
+        self.connect("destroy", lambda w: self.load_skin_thread.cancel())
         
         # Add drag image support.
         self.drag_dest_set(
@@ -156,24 +387,36 @@ class SkinPreviewPage(gtk.VBox):
 
         self.connect("drag-data-received", self.drag_skin_file)
         
-    @post_gui    
-    def add_skin_icon(self, root, filename):
-        '''Add skin icon.'''
+        # Show import progress in left button area of dialog.
+        self.import_progress_label = Label("")
+        self.dialog.left_button_box.set_buttons([self.import_progress_label])
+        
+    def add_skin_icons(self, skin_infos):
+        '''Add batch of skin icons, skin_infos is list of (root, filename).'''
         self.preview_view.add_items([SkinPreviewIcon(
                     root, 
                     filename, 
                     self.change_skin_callback, 
                     self.switch_edit_page_callback,
-                    self.pop_delete_skin_dialog)])
+                    self.pop_delete_skin_dialog) for (root, filename) in skin_infos])
+        self.highlight_skin()
         
-    @post_gui
     def add_add_icon(self):
         '''Add add icon.'''
         self.preview_view.add_items([SkinAddIcon(self.create_skin_from_file)])
         
     def drag_skin_file(self, widget, drag_context, x, y, selection_data, info, timestamp):
-        '''Drag skin file.'''
-        self.create_skin_from_file(urllib.unquote(selection_data.get_uris()[0].split("file://")[1]))            
+        '''Drag skin file, import in worker threads when drag many files.'''
+        filepaths = [urllib.unquote(uri.split("file://")[1]) 
+                     for uri in selection_data.get_uris() if uri.startswith("file://")]
+        if len(filepaths) == 1:
+            self.create_skin_from_file(filepaths[0])
+        elif len(filepaths) > 1:
+            self.import_skins(filepaths, self.update_import_progress)
+            
+    def update_import_progress(self, finish_count, total_count):
+        '''Update import progress.'''
+        self.import_progress_label.set_text(_("Importing skins %s/%s") % (finish_count, total_count))
         
     def create_skin_from_file(self, skin_file):
         '''Create skin from file.'''
@@ -185,107 +428,83 @@ class SkinPreviewPage(gtk.VBox):
         
     def create_skin_from_image(self, filepath):
         '''Create skin from image.'''
-        # Init.
-        skin_dir = os.path.join(skin_config.user_skin_dir, str(uuid.uuid4()))
-        skin_image_file = os.path.basename(filepath)
-        config_file = os.path.join(skin_dir, "config.ini")
-        dominant_color = get_dominant_color(filepath)
-        similar_color = find_similar_color(dominant_color)[0]
-        default_config = [
-            ("theme", [("theme_name", similar_color)]),
-            ("application", [("app_id", skin_config.app_given_id),
-                             ("app_version", skin_config.app_given_version)]),
-            ("background", [("image", skin_image_file),
-                            ("x", "0"),
-                            ("y", "0"),
-                            ("scale_x", "1.0"),
-                            ("scale_y", "1.0"),
-                            ("dominant_color", dominant_color)]),
-            ("action", [("deletable", "True"),
-                        ("editable", "True"),
-                        ("vertical_mirror", "False"),
-                        ("horizontal_mirror", "False")])]
-        
-        # Create skin directory.
-        create_directory(skin_dir, True)
-        
-        # Copy skin image file.
-        shutil.copy(filepath, skin_dir)        
-        
-        # Touch skin config file.
-        touch_file(config_file)
-        
-        # Write default skin config information.
-        Config(config_file, default_config).write()
-        
-        # Apply new skin.
-        self.preview_view.add_items([SkinPreviewIcon(
-                    skin_dir,
-                    skin_image_file,
-                    self.change_skin_callback,
-                    self.switch_edit_page_callback,
-                    self.pop_delete_skin_dialog
-                    )], -1)
-        if skin_config.reload_skin(os.path.basename(skin_dir)):
-            skin_config.apply_skin()
-            
-            self.highlight_skin()    
-            
-            # Scroll scrollbar to bottom.
-            scroll_to_bottom(self.preview_scrolled_window)            
+        skin_dir = import_skin_from_image(
+            filepath, 
+            skin_config.user_skin_dir,
+            skin_config.app_given_id, 
+            skin_config.app_given_version)
+        self.add_imported_skins([skin_dir])
         
     def create_skin_from_package(self, filepath):
         '''Create skin from package.'''
-        # Init.
-        skin_dir = os.path.join(skin_config.user_skin_dir, str(uuid.uuid4()))
-        
-        # Create skin directory.
-        create_directory(skin_dir, True)
-        
-        # Extract skin package.
-        tar = tarfile.open(filepath, "r:gz")
-        tar.extractall(skin_dir)
-        
-        # Get skin image file.
-        config = Config(os.path.join(skin_dir, "config.ini"))
-        config.load()
-
-        # Move theme files to given directory if theme is not in default theme list.
-        skin_theme_name = config.get("theme", "theme_name")
-        if not skin_theme_name in COLOR_SEQUENCE:
-            # Check version when package have special theme that not include in standard themes.
-            app_id = config.get("application", "app_id")
-            app_version = config.get("application", "app_version")
-            if app_id == skin_config.app_given_id and app_version == skin_config.app_given_version:
-                # Remove same theme from given directories.
-                remove_directory(os.path.join(skin_config.ui_theme_dir, skin_theme_name))
-                remove_directory(os.path.join(skin_config.app_theme_dir, skin_theme_name))
-                
-                # Move new theme files to given directories.
-                shutil.move(os.path.join(skin_dir, "ui_theme", skin_theme_name), skin_config.ui_theme_dir)
-                shutil.move(os.path.join(skin_dir, "app_theme", skin_theme_name), skin_config.app_theme_dir)
-                
-                # Remove temp theme directories under skin directory.
-                remove_directory(os.path.join(skin_dir, "ui_theme"))        
-                remove_directory(os.path.join(skin_dir, "app_theme"))        
+        skin_dir = import_skin_from_package(
+            filepath, 
+            skin_config.user_skin_dir, 
+            skin_config.app_given_id, 
+            skin_config.app_given_version,
+            skin_config.ui_theme_dir, 
+            skin_config.app_theme_dir)
+        if skin_dir == None:
+            ConfirmDialog(_("Skin version mismatch"),
+                          _("Import skin version is mismatch with current one!")).show_all()
+        else:
+            self.add_imported_skins([skin_dir])
+            
+    def import_skins(self, filepaths, progress_callback=None):
+        '''Import skin files in worker threads, progress_callback(finish_count, total_count) is called in main loop.'''
+        ImportSkinThread(
+            filepaths, 
+            (skin_config.user_skin_dir,
+             skin_config.app_given_id,
+             skin_config.app_given_version,
+             skin_config.ui_theme_dir,
+             skin_config.app_theme_dir),
+            self.finish_import_skins,
+            progress_callback).start()
+        
+    def finish_import_skins(self, import_results):
+        '''Finish import skins, update preview and apply skin once for whole batch.'''
+        self.import_progress_label.set_text("")
+        
+        skin_dirs = []
+        version_mismatch = False
+        for (filepath, skin_dir, error) in import_results:
+            if skin_dir != None:
+                skin_dirs.append(skin_dir)
+            elif error == IMPORT_SKIN_VERSION_MISMATCH:
+                version_mismatch = True
             else:
-                # Remove skin directory if version mismatch.
-                remove_directory(skin_dir)
+                print "import skin %s error: %s" % (filepath, error)
                 
-                ConfirmDialog(_("Skin version mismatch"),
-                              _("Import skin version is mismatch with current one!")).show_all()
-                return 
+        if version_mismatch:
+            ConfirmDialog(_("Skin version mismatch"),
+                          _("Import skin version is mismatch with current one!")).show_all()
         
-        # Apply new skin.
-        skin_image_file = config.get("background", "image")
-        self.preview_view.add_items([SkinPreviewIcon(
+        if len(skin_dirs) > 0:
+            self.add_imported_skins(skin_dirs)
+            
+        return False    
+            
+    def add_imported_skins(self, skin_dirs):
+        '''Add imported skins to preview, and apply last one.'''
+        skin_icons = []
+        for skin_dir in skin_dirs:
+            config = Config(os.path.join(skin_dir, "config.ini"))
+            config.load()
+            skin_icons.append(SkinPreviewIcon(
                     skin_dir,
-                    skin_image_file,
+                    config.get("background", "image"),
                     self.change_skin_callback,
                     self.switch_edit_page_callback,
                     self.pop_delete_skin_dialog
-                    )], -1)
-        if skin_config.reload_skin(os.path.basename(skin_dir)):
+                    ))
+        self.preview_view.add_items(skin_icons, -1)
+        
+        # Theme of skin package maybe replace old one.
+        skin_config.clear_theme_cache()
+        
+        # Apply new skin.
+        if skin_config.reload_skin(os.path.basename(skin_dirs[-1])):
             skin_config.apply_skin()
             
             self.highlight_skin()    
@@ -323,6 +542,7 @@ class SkinPreviewPage(gtk.VBox):
                         
             # Remove skin directory.
             remove_directory(item.skin_dir)
+            skin_config.clear_theme_cache()
             
             # Remove item from icon view.
             self.preview_view.delete_items([item])
@@ -337,6 +557,9 @@ class SkinPreviewIcon(gobject.GObject):
     BUTTON_HIDE = 0
     BUTTON_NORMAL = 1
     BUTTON_HOVER = 2
+    
+    PREVIEW_WIDTH = 86
+    PREVIEW_HEIGHT = 56
 	
     __gsignals__ = {
         "redraw-request" : (gobject.SIGNAL_RUN_LAST, gobject.TYPE_NONE, ()),
@@ -347,8 +570,9 @@ class SkinPreviewIcon(gobject.GObject):
                  background_file, 
                  change_skin_callback,
                  switch_edit_page_callback,
-                 pop_delete_skin_dialog_callback):
-        '''Init item icon.'''
+                 pop_delete_skin_dialog_callback,
+                 pixbuf=None):
+        '''Init item icon, thumbnail load lazily by item_image_loader if pixbuf is None.'''
         gobject.GObject.__init__(self)
         self.skin_dir = skin_dir
         self.background_file = background_file
@@ -356,8 +580,8 @@ class SkinPreviewIcon(gobject.GObject):
         self.switch_edit_page_callback = switch_edit_page_callback
         self.pop_delete_skin_dialog_callback = pop_delete_skin_dialog_callback
         self.background_path = os.path.join(skin_dir, background_file)
-        self.width = 86
-        self.height = 56
+        self.width = self.PREVIEW_WIDTH
+        self.height = self.PREVIEW_HEIGHT
         self.icon_padding = 2
         self.padding_x = 7
         self.padding_y = 10
@@ -366,7 +590,8 @@ class SkinPreviewIcon(gobject.GObject):
         self.delete_button_status = self.BUTTON_HIDE
         self.edit_button_status = self.BUTTON_HIDE
         
-        self.pixbuf = get_optimum_pixbuf_from_file(self.background_path, self.width, self.height, False)
+        self.pixbuf = pixbuf
+        self.image_loaded = pixbuf != None
         
         self.show_delete_button_id = None
         self.show_edit_button_id = None
@@ -408,6 +633,21 @@ class SkinPreviewIcon(gobject.GObject):
         '''Emit redraw-request signal.'''
         self.emit("redraw-request")
         
+    def need_load_image(self):
+        '''Need load thumbnail.'''
+        return not self.image_loaded
+    
+    def load_image(self):
+        '''Load thumbnail, call in worker thread.'''
+        return get_skin_thumbnail(self.background_path, self.width, self.height)
+    
+    def set_image(self, pixbuf):
+        '''Set thumbnail loaded by item_image_loader.'''
+        self.pixbuf = pixbuf
+        self.image_loaded = True
+        
+        self.emit_redraw_request()
+        
     def get_width(self):
         '''Get width.'''
         return self.width + (self.icon_padding + self.padding_x) * 2
@@ -431,26 +671,27 @@ class SkinPreviewIcon(gobject.GObject):
             rect.x + self.padding_x,
             rect.y + self.padding_y)    
         
-        # Draw background.
-        with cairo_state(cr):
-            # Mirror image if necessarily.
-            preview_config = Config(os.path.join(self.skin_dir, "config.ini"))    
-            preview_config.load()
-            
-            pixbuf = self.pixbuf.copy()
-            if preview_config.getboolean("action", "vertical_mirror"):
-                pixbuf = pixbuf.flip(True)
-            
-            if preview_config.getboolean("action", "horizontal_mirror"):
-                pixbuf = pixbuf.flip(False)
+        # Draw background, just draw frame as placeholder before thumbnail load finish.
+        if self.pixbuf != None:
+            with cairo_state(cr):
+                # Mirror image if necessarily.
+                preview_config = Config(os.path.join(self.skin_dir, "config.ini"))    
+                preview_config.load()
                 
-            # Draw cover.
-            draw_pixbuf(
-                cr, 
-                pixbuf,
-                rect.x + (rect.width - self.pixbuf.get_width()) / 2,
-                rect.y + (rect.height - self.pixbuf.get_height()) / 2
-                )
+                pixbuf = self.pixbuf.copy()
+                if preview_config.getboolean("action", "vertical_mirror"):
+                    pixbuf = pixbuf.flip(True)
+                
+                if preview_config.getboolean("action", "horizontal_mirror"):
+                    pixbuf = pixbuf.flip(False)
+                    
+                # Draw cover.
+                draw_pixbuf(
+                    cr, 
+                    pixbuf,
+                    rect.x + (rect.width - self.pixbuf.get_width()) / 2,
+                    rect.y + (rect.height - self.pixbuf.get_height()) / 2
+                    )
             
         # Draw delete button.
         if self.delete_button_status != self.BUTTON_HIDE:
@@ -703,6 +944,7 @@ class SkinEditPage(gtk.VBox):
         gtk.VBox.__init__(self)
         self.dialog = dialog
         self.switch_preview_page = switch_preview_page
+        self.prefetch_color_item = None
         self.edit_area_align = gtk.Alignment()
         self.edit_area_align.set(0.5, 0.5, 1, 1)
         self.edit_area_align.set_padding(5, 0, 28, 28)
@@ -816,6 +1058,7 @@ class SkinEditPage(gtk.VBox):
         self.highlight_color_icon(skin_config.theme_name)
         
         self.color_select_view.connect("button-press-item", self.change_skin_theme)
+        self.color_select_view.connect("motion-notify-item", self.hover_skin_theme)
         
     def click_vertical_mirror_button(self):
         '''Click vertical mirror button.'''
@@ -827,6 +1070,12 @@ class SkinEditPage(gtk.VBox):
         skin_config.horizontal_mirror_background()
         skin_config.save_skin()
         
+    def hover_skin_theme(self, view, item, x, y):
+        '''Prefetch theme of hover color, just start prefetch when hover item changed.'''
+        if item != self.prefetch_color_item:
+            self.prefetch_color_item = item
+            skin_config.prefetch_theme(item.color)
+            
     def change_skin_theme(self, view, item, x, y):
         '''Change skin theme.'''
         # Highlight theme icon.
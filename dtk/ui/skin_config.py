@@ -24,13 +24,19 @@ from cache_pixbuf import CachePixbuf
 from config import Config
 from constant import SHADE_SIZE, COLOR_SEQUENCE
 from draw import draw_pixbuf, draw_vlinear, draw_hlinear
-from utils import color_hex_to_cairo, remove_file, touch_file, create_directory
+from lru_cache import LRUCache
+from utils import (color_hex_to_cairo, remove_file, touch_file, create_directory,
+                   remove_timeout_id)
+import cairo
 import gobject
 import gtk
 import os
 import tarfile
 import uuid
 
+BACKGROUND_CACHE_SIZE = 4
+BACKGROUND_RESIZE_SETTLE_DELAY = 200 # milliseconds
+
 class SkinConfig(gobject.GObject):
     '''SkinConfig.'''
 	
@@ -40,6 +46,11 @@ class SkinConfig(gobject.GObject):
         gobject.GObject.__init__(self)
         self.cache_pixbuf = CachePixbuf()
         
+        # Composited background surfaces of toplevel size, 
+        # background_ticker increase when background pixbuf changed.
+        self.background_cache = LRUCache(BACKGROUND_CACHE_SIZE)
+        self.background_ticker = 0
+        
         self.theme_list = []
         self.window_list = []
         
@@ -134,10 +145,11 @@ class SkinConfig(gobject.GObject):
             skin_config.write(self.skin_config_file)
             
     def reload_skin(self, skin_name=None):
-        '''Reload skin.'''
+        '''Reload skin, theme directory cache is cleared when reload current skin.'''
         if skin_name:
             return self.load_skin(skin_name)
         else:
+            self.clear_theme_cache()
             return self.load_skin(self.skin_name)
         
     def load_skin(self, skin_name, system_skin_dir=None, user_skin_dir=None):
@@ -183,6 +195,8 @@ class SkinConfig(gobject.GObject):
             
             # Generate background pixbuf.
             self.background_pixbuf = gtk.gdk.pixbuf_new_from_file(self.get_skin_file_path(self.image))
+            self.background_ticker += 1
+            self.background_cache.clear()
             
             # Save skin name.
             self.save_skin_name()
@@ -212,6 +226,16 @@ class SkinConfig(gobject.GObject):
         
         self.apply_skin()
         
+    def prefetch_theme(self, theme_name):
+        '''Prefetch theme in background, make change to theme faster.'''
+        for theme in self.theme_list:
+            theme.prefetch_theme(theme_name)
+        
+    def clear_theme_cache(self):
+        '''Clear theme directory cache of themes, call when theme directories changed.'''
+        for theme in self.theme_list:
+            theme.clear_theme_dir_cache()
+            
     def apply_skin(self):
         '''Apply skin.'''
         # Change theme.
@@ -287,12 +311,63 @@ class SkinConfig(gobject.GObject):
     def render_background(self, cr, widget, x, y, 
                           translate_width=0,
                           translate_height=0):
-        '''Render background.'''
+        '''Render background, blit from composited background surface of toplevel size.'''
         # Init.
         toplevel_rect = widget.get_toplevel().allocation
         render_width = toplevel_rect.width + translate_width
         render_height = toplevel_rect.height + translate_height
+        if render_width <= 0 or render_height <= 0:
+            return
+        
+        # Draw background directly when toplevel is resizing,
+        # don't composite new surface for every size in resize.
+        if self.is_toplevel_resizing(widget.get_toplevel()):
+            self.draw_background(cr, x, y, render_width, render_height)
+            return
+        
+        # Composite background when skin, image position or window size changed.
+        cache_key = (render_width, render_height, self.background_ticker,
+                     self.x, self.y, self.scale_x, self.scale_y,
+                     self.vertical_mirror, self.horizontal_mirror, self.dominant_color)
+        surface = self.background_cache.get(cache_key)
+        if surface == None:
+            surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, render_width, render_height)
+            self.draw_background(cairo.Context(surface), 0, 0, render_width, render_height)
+            self.background_cache.set(cache_key, surface)
+            
+        # Blit background, only area in clip of cairo context is painted.
+        cr.set_source_surface(surface, x, y)
+        cr.paint()
+        
+    def is_toplevel_resizing(self, toplevel):
+        '''Is toplevel resizing, size settle when it don't change in BACKGROUND_RESIZE_SETTLE_DELAY.'''
+        size = (toplevel.allocation.width, toplevel.allocation.height)
+        resize_info = toplevel.get_data("skin_background_resize")
+        if resize_info == None:
+            # Composite background when first render toplevel.
+            toplevel.set_data("skin_background_resize", (size, None))
+            return False
+        
+        (last_size, settle_id) = resize_info
+        if size != last_size:
+            remove_timeout_id(settle_id)
+            settle_id = gobject.timeout_add(BACKGROUND_RESIZE_SETTLE_DELAY, 
+                                            lambda : self.settle_toplevel_size(toplevel))
+            toplevel.set_data("skin_background_resize", (size, settle_id))
+            return True
+        
+        return settle_id != None
+    
+    def settle_toplevel_size(self, toplevel):
+        '''Toplevel size settled, redraw to composite background of new size.'''
+        (size, _) = toplevel.get_data("skin_background_resize")
+        toplevel.set_data("skin_background_resize", (size, None))
+        toplevel.queue_draw()
+        
+        return False
         
+    def draw_background(self, cr, x, y, render_width, render_height):
+        '''Draw background image, dominant color and shade gradient.'''
         # Draw background.
         background_x = int(self.x * self.scale_x)
         background_y = int(self.y * self.scale_y)
@@ -28,7 +28,7 @@ from draw import draw_hlinear
 from keymap import get_keyevent_name
 from menu import Menu
 from theme import ui_theme
-from utils import propagate_expose, cairo_state, color_hex_to_cairo, get_content_size, is_double_click, is_right_button, is_left_button, alpha_color_hex_to_cairo
+from utils import propagate_expose, cairo_state, color_hex_to_cairo, get_content_size, is_double_click, is_right_button, is_left_button, alpha_color_hex_to_cairo, get_font_description
 from textbuffer import TextBuffer, TextIter
 import gobject
 import gtk
@@ -220,7 +220,7 @@ class TextView(gtk.EventBox):
         cr = widget.window.cairo_create()
         context = pangocairo.CairoContext(cr)
         layout = context.create_layout()
-        layout.set_font_description(pango.FontDescription("%s %s" % (DEFAULT_FONT, self.font_size)))
+        layout.set_font_description(get_font_description(DEFAULT_FONT, self.font_size))
         layout.set_text(self.__buffer.get_text())
         text_width = self.get_content_width("x")
         text_height = get_content_size("好Height", self.font_size)[-1]
@@ -300,7 +300,7 @@ class TextView(gtk.EventBox):
             
             # pango layout
             layout = context.create_layout()
-            layout.set_font_description(pango.FontDescription("%s %s" % (DEFAULT_FONT, self.font_size)))
+            layout.set_font_description(get_font_description(DEFAULT_FONT, self.font_size))
             
             text = self.__buffer.get_text()
             layout.set_text(text)
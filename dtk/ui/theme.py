@@ -20,10 +20,16 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from draw import clear_text_surface_cache
 from skin_config import skin_config
-from utils import eval_file, get_parent_dir, create_directory
+from theme_bundle import load_theme_bundle
+from threads import AnonymityThread
+from utils import eval_file, get_parent_dir, create_directory, clear_text_layout_cache
 import gtk
+import hashlib
 import os
+import threading as td
+import weakref
 
 class DynamicTreeView(object):
     '''Dynamic tree view.'''
@@ -145,19 +151,82 @@ class DynamicShadowColor(object):
         '''Get color info.'''
         return self.color_info
 
+class PixbufRegistry(object):
+    '''Process-wide pixbuf registry, image files with same content share one pixbuf.'''
+    
+    def __init__(self):
+        '''Init pixbuf registry.'''
+        self.path_dict = {}
+        self.pixbuf_dict = weakref.WeakValueDictionary()
+        self.lock = td.Lock() # registry is shared by theme prefetch thread
+        
+    def get_pixbuf(self, filepath):
+        '''Get pixbuf of file, just decode when no pixbuf with same content alive.'''
+        # Find content key with file path, mtime and size, avoid read file again.
+        file_stat = os.stat(filepath)
+        path_key = (filepath, file_stat.st_mtime, file_stat.st_size)
+        with self.lock:
+            content_key = self.path_dict.get(path_key)
+            pixbuf = self.pixbuf_dict.get(content_key)
+        if pixbuf != None:
+            return pixbuf
+        
+        # Read file and find pixbuf with content hash.
+        image_file = open(filepath, "rb")
+        try:
+            data = image_file.read()
+        finally:
+            image_file.close()
+        content_key = hashlib.md5(data).hexdigest()
+        with self.lock:
+            self.path_dict[path_key] = content_key
+        
+        return self.get_pixbuf_from_data(data, content_key)
+    
+    def get_pixbuf_from_data(self, data, content_key):
+        '''Get pixbuf of image data, just decode when no pixbuf with same content alive.'''
+        with self.lock:
+            pixbuf = self.pixbuf_dict.get(content_key)
+        if pixbuf == None:
+            loader = gtk.gdk.PixbufLoader()
+            loader.write(data)
+            loader.close()
+            pixbuf = loader.get_pixbuf()
+            with self.lock:
+                self.pixbuf_dict[content_key] = pixbuf
+            
+        return pixbuf
+
+pixbuf_registry = PixbufRegistry()
+
 class DynamicPixbuf(object):
-    '''Dynamic pixbuf.'''
+    '''Dynamic pixbuf, decode pixbuf when first call get_pixbuf after update.'''
     
-    def __init__(self, filepath):
+    def __init__(self, filepath, theme_bundle=None):
         '''Init.'''
-        self.update(filepath)
+        self.update(filepath, theme_bundle)
         
-    def update(self, filepath):
-        '''Update path.'''
-        self.pixbuf = gtk.gdk.pixbuf_new_from_file(filepath)
+    def update(self, filepath, theme_bundle=None):
+        '''Update path, image is read from theme bundle if bundle contains it.'''
+        self.filepath = filepath
+        self.theme_bundle = theme_bundle
+        self.pixbuf = None
+        
+    def update_from(self, dynamic_pixbuf):
+        '''Update path and decoded pixbuf from other dynamic pixbuf.'''
+        self.filepath = dynamic_pixbuf.filepath
+        self.theme_bundle = dynamic_pixbuf.theme_bundle
+        self.pixbuf = dynamic_pixbuf.pixbuf
 
     def get_pixbuf(self):
         '''Get pixbuf.'''
+        if self.pixbuf == None:
+            if self.theme_bundle != None and self.theme_bundle.has_image(self.filepath):
+                (content_key, data) = self.theme_bundle.get_image(self.filepath)
+                self.pixbuf = pixbuf_registry.get_pixbuf_from_data(data, content_key)
+            else:
+                self.pixbuf = pixbuf_registry.get_pixbuf(self.filepath)
+            
         return self.pixbuf
 
 class Theme(object):
@@ -169,8 +238,13 @@ class Theme(object):
         self.system_theme_dir = system_theme_dir
         self.user_theme_dir = user_theme_dir
         self.theme_info_file = "theme.txt"
+        self.theme_name = None
         self.ticker = 0
         self.pixbuf_dict = {}
+        self.theme_dir_dict = {}
+        self.theme_bundle_dict = {}
+        self.prefetch_theme_name = None
+        self.prefetch_result = None
         self.color_dict = {}
         self.alpha_color_dict = {}
         self.shadow_color_dict = {}
@@ -184,7 +258,7 @@ class Theme(object):
         self.theme_name = skin_config.theme_name
         
         # Scan dynamic theme_info file.
-        theme_info = eval_file(self.get_theme_file_path(self.theme_info_file))
+        theme_info = self.get_theme_info()
         
         # Init dynamic colors.
         for (color_name, color) in theme_info["colors"].items():
@@ -201,25 +275,81 @@ class Theme(object):
         # Add in theme list of skin_config.
         skin_config.add_theme(self)
         
-    def get_theme_file_path(self, filename):
-        '''Get theme file path.'''
-        theme_file_dir = None
-        for theme_dir in [self.system_theme_dir, self.user_theme_dir]:
-            if os.path.exists(theme_dir):
-                if self.theme_name in os.listdir(os.path.expanduser(theme_dir)):
-                    theme_file_dir = theme_dir
-                    break
+    def get_theme_file_path(self, filename, theme_name=None):
+        '''Get theme file path, use current theme if theme_name is None.'''
+        if theme_name == None:
+            theme_name = self.theme_name
             
+        theme_file_dir = self.get_theme_dir(theme_name)
         if theme_file_dir:
-            return os.path.join(theme_file_dir, self.theme_name, filename)
+            return os.path.join(theme_file_dir, theme_name, filename)
         else:
             return None
             
+    def get_theme_dir(self, theme_name):
+        '''Get directory that contains theme, result is cached.'''
+        if not self.theme_dir_dict.has_key(theme_name):
+            theme_file_dir = None
+            for theme_dir in [self.system_theme_dir, self.user_theme_dir]:
+                if os.path.exists(theme_dir):
+                    if theme_name in os.listdir(os.path.expanduser(theme_dir)):
+                        theme_file_dir = theme_dir
+                        break
+                    
+            # Don't cache missing theme, it maybe install later.
+            if theme_file_dir == None:
+                return None
+            
+            self.theme_dir_dict[theme_name] = theme_file_dir
+            
+        return self.theme_dir_dict[theme_name]
+    
+    def clear_theme_dir_cache(self):
+        '''Clear theme directory and bundle cache, and reload current theme, call when theme directories changed.'''
+        # Close old bundles, dynamic pixbufs still use them will read image from theme directory.
+        for theme_bundle in self.theme_bundle_dict.values():
+            if theme_bundle != None:
+                theme_bundle.close()
+        self.theme_dir_dict = {}
+        self.theme_bundle_dict = {}
+        
+        # Drop prefetch result, it maybe read from old theme files.
+        self.prefetch_theme_name = None
+        self.prefetch_result = None
+        
+        # Reload current theme, files of it maybe replaced.
+        if self.theme_name != None and self.get_theme_dir(self.theme_name) != None:
+            self.change_theme(self.theme_name)
+        
+    def get_theme_bundle(self, theme_name):
+        '''Get compiled bundle of theme, return None if theme haven't compiled.'''
+        if not self.theme_bundle_dict.has_key(theme_name):
+            theme_dir = self.get_theme_dir(theme_name)
+            if theme_dir == None:
+                return None
+            
+            self.theme_bundle_dict[theme_name] = load_theme_bundle(os.path.join(theme_dir, theme_name))
+            
+        return self.theme_bundle_dict[theme_name]
+    
+    def get_theme_info(self, theme_name=None):
+        '''Get theme info, read from theme bundle first, fallback to theme.txt.'''
+        if theme_name == None:
+            theme_name = self.theme_name
+            
+        theme_bundle = self.get_theme_bundle(theme_name)
+        if theme_bundle != None:
+            return theme_bundle.get_theme_info()
+        else:
+            return eval_file(self.get_theme_file_path(self.theme_info_file, theme_name))
+            
     def get_pixbuf(self, path):
         '''Get dynamic pixbuf.'''
         # Just init pixbuf_dict when first load some pixbuf.
         if not self.pixbuf_dict.has_key(path):
-            self.pixbuf_dict[path] = DynamicPixbuf(self.get_theme_file_path("image/%s" % (path)))
+            self.pixbuf_dict[path] = DynamicPixbuf(
+                self.get_theme_file_path("image/%s" % (path)),
+                self.get_theme_bundle(self.theme_name))
             
         return self.pixbuf_dict[path]
 
@@ -239,6 +369,48 @@ class Theme(object):
         '''Get ticker.'''
         return self.ticker    
     
+    def prefetch_theme(self, theme_name):
+        '''Decode pixbufs and colors of theme in background, change_theme just swap them if prefetch finish.'''
+        if theme_name == self.theme_name or theme_name == self.prefetch_theme_name:
+            return
+        
+        # Resolve theme directory, bundle and file paths in main thread,
+        # theme caches just access in main thread, prefetch thread only decode pixbufs.
+        if self.get_theme_dir(theme_name) == None:
+            return
+        
+        try:
+            theme_bundle = self.get_theme_bundle(theme_name)
+            theme_info = self.get_theme_info(theme_name)
+        except Exception, e:
+            print "prefetch_theme error: %s" % (e)
+            return
+        filepaths = {}
+        for path in self.pixbuf_dict.keys():
+            filepaths[path] = self.get_theme_file_path("image/%s" % (path), theme_name)
+        
+        self.prefetch_theme_name = theme_name
+        self.prefetch_result = None
+        AnonymityThread(lambda : self.prefetch_theme_resources(theme_name, theme_info, theme_bundle, filepaths)).start()
+        
+    def prefetch_theme_resources(self, theme_name, theme_info, theme_bundle, filepaths):
+        '''Decode pixbufs of theme, call in background thread.'''
+        try:
+            prefetch_pixbufs = {}
+            for (path, filepath) in filepaths.items():
+                # Stop prefetch if other theme prefetch or theme changed.
+                if self.prefetch_theme_name != theme_name:
+                    return
+                
+                dynamic_pixbuf = DynamicPixbuf(filepath, theme_bundle)
+                dynamic_pixbuf.get_pixbuf()
+                prefetch_pixbufs[path] = dynamic_pixbuf
+                
+            if self.prefetch_theme_name == theme_name:
+                self.prefetch_result = (theme_name, theme_info, prefetch_pixbufs)
+        except Exception, e:
+            print "prefetch_theme error: %s" % (e)
+    
     def change_theme(self, new_theme_name):
         '''Change ui_theme.'''
         # Update ticker.
@@ -246,14 +418,30 @@ class Theme(object):
         
         # Change theme name.
         self.theme_name = new_theme_name
+        
+        # Clear text layout cache and text surface cache.
+        clear_text_layout_cache()
+        clear_text_surface_cache()
 
-        # Update dynmaic pixbuf.
+        # Take prefetch result, and stop running prefetch.
+        prefetch_result = self.prefetch_result
+        self.prefetch_theme_name = None
+        self.prefetch_result = None
+        if prefetch_result != None and prefetch_result[0] == new_theme_name:
+            (_, theme_info, prefetch_pixbufs) = prefetch_result
+        else:
+            theme_info = self.get_theme_info()
+            prefetch_pixbufs = {}
+        
+        # Update dynmaic pixbuf, swap prefetched pixbuf, 
+        # or pixbuf will decode when it's drawing.
         for (path, pixbuf) in self.pixbuf_dict.items():
-            pixbuf.update(self.get_theme_file_path("image/%s" % (path)))
+            if prefetch_pixbufs.has_key(path):
+                pixbuf.update_from(prefetch_pixbufs[path])
+            else:
+                pixbuf.update(self.get_theme_file_path("image/%s" % (path)), self.get_theme_bundle(self.theme_name))
             
         # Update dynamic colors.
-        theme_info = eval_file(self.get_theme_file_path(self.theme_info_file))
-            
         for (color_name, color) in theme_info["colors"].items():
             self.color_dict[color_name].update(color)
             
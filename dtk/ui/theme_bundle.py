@@ -0,0 +1,212 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2011 ~ 2012 Deepin, Inc.
+#               2011 ~ 2012 Wang Yong
+# 
+# Author:     Wang Yong <lazycat.manatee@gmail.com>
+# Maintainer: Wang Yong <lazycat.manatee@gmail.com>
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import hashlib
+import marshal
+import mmap
+import os
+import struct
+import sys
+
+THEME_BUNDLE_FILE = "theme.bundle"
+THEME_BUNDLE_MAGIC = "DTKTHEME\x03"
+THEME_BUNDLE_HEADER_FORMAT = "<I"
+
+def compile_theme_bundle(theme_path, bundle_path=None):
+    '''
+    Compile theme directory to bundle, bundle contains parsed theme.txt and packed images with index.
+    
+    Bundle also record mtime and size of theme.txt and file names of image directories,
+    bundle is out of date if theme.txt changed or any image added, removed or renamed.
+    '''
+    if bundle_path == None:
+        bundle_path = os.path.join(theme_path, THEME_BUNDLE_FILE)
+        
+    # Parse theme info.
+    theme_info_path = os.path.join(theme_path, "theme.txt")
+    theme_info_file = open(theme_info_path, "r")
+    try:
+        theme_info = eval(theme_info_file.read())
+    finally:
+        theme_info_file.close()
+    source_files = {"theme.txt" : get_file_stamp(theme_info_path)}
+    source_dirs = {}
+        
+    # Pack images, index is relative path of image to (offset, length, content hash).
+    image_index = {}
+    image_datas = []
+    offset = 0
+    for root, dirs, files in os.walk(os.path.join(theme_path, "image")):
+        dirs.sort()
+        source_dirs[os.path.relpath(root, theme_path)] = sorted(dirs + files)
+        for filename in sorted(files):
+            filepath = os.path.join(root, filename)
+            image_file = open(filepath, "rb")
+            try:
+                data = image_file.read()
+            finally:
+                image_file.close()
+                
+            image_key = os.path.relpath(filepath, theme_path)
+            image_index[image_key] = (offset, len(data), hashlib.md5(data).hexdigest())
+            image_datas.append(data)
+            offset += len(data)
+    
+    # Write bundle to temp file first, make sure bundle is complete when loading.
+    header = marshal.dumps({"theme_info" : theme_info, "images" : image_index, 
+                            "files" : source_files, "dirs" : source_dirs})
+    temp_path = "%s.tmp" % (bundle_path)
+    bundle_file = open(temp_path, "wb")
+    try:
+        bundle_file.write(THEME_BUNDLE_MAGIC)
+        bundle_file.write(struct.pack(THEME_BUNDLE_HEADER_FORMAT, len(header)))
+        bundle_file.write(header)
+        for data in image_datas:
+            bundle_file.write(data)
+    finally:
+        bundle_file.close()
+    os.rename(temp_path, bundle_path)
+    
+    return bundle_path
+
+def compile_theme_bundles(theme_dir):
+    '''Compile bundles of all themes under theme directory, return bundle paths.'''
+    bundle_paths = []
+    for theme_name in sorted(os.listdir(theme_dir)):
+        theme_path = os.path.join(theme_dir, theme_name)
+        if os.path.exists(os.path.join(theme_path, "theme.txt")):
+            bundle_paths.append(compile_theme_bundle(theme_path))
+            
+    return bundle_paths
+
+def get_file_stamp(filepath):
+    '''Get (mtime, size) of file, mtime in seconds because install only copy mtime in seconds.'''
+    file_stat = os.stat(filepath)
+    return (int(file_stat.st_mtime), file_stat.st_size)
+
+def load_theme_bundle(theme_path):
+    '''Load bundle of theme, return None if bundle not exists or theme changed after compile.'''
+    bundle_path = os.path.join(theme_path, THEME_BUNDLE_FILE)
+    try:
+        if not os.path.exists(bundle_path):
+            return None
+        
+        theme_bundle = ThemeBundle(theme_path, bundle_path)
+        if not theme_bundle.is_up_to_date():
+            print "load_theme_bundle: %s is out of date, use theme directory instead." % (bundle_path)
+            theme_bundle.close()
+            return None
+        
+        return theme_bundle
+    except Exception, e:
+        print "load_theme_bundle error: %s" % (e)
+        return None
+
+class ThemeBundle(object):
+    '''Theme bundle, images are read from memory map of bundle file.'''
+    
+    def __init__(self, theme_path, bundle_path):
+        '''Init theme bundle.'''
+        self.theme_path = theme_path
+        
+        bundle_file = open(bundle_path, "rb")
+        try:
+            # Check bundle format.
+            if bundle_file.read(len(THEME_BUNDLE_MAGIC)) != THEME_BUNDLE_MAGIC:
+                raise ValueError("%s is not theme bundle" % (bundle_path))
+            
+            # Read header.
+            header_size = struct.calcsize(THEME_BUNDLE_HEADER_FORMAT)
+            (header_length, ) = struct.unpack(THEME_BUNDLE_HEADER_FORMAT, bundle_file.read(header_size))
+            header = marshal.loads(bundle_file.read(header_length))
+            self.theme_info = header["theme_info"]
+            self.image_index = header["images"]
+            self.source_files = header["files"]
+            self.source_dirs = header["dirs"]
+            self.data_offset = len(THEME_BUNDLE_MAGIC) + header_size + header_length
+            
+            # Map images data, mmap keep file open after bundle file closed.
+            if len(self.image_index) > 0:
+                self.image_map = mmap.mmap(bundle_file.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self.image_map = None
+        finally:
+            bundle_file.close()
+            
+    def is_up_to_date(self):
+        '''
+        Whether theme.txt and file names of image directories still same as compile time.
+        
+        Just list image directories instead of stat every image, keep bundle load cheap,
+        image modified in place need compile bundle again.
+        '''
+        for (file_key, file_stamp) in self.source_files.items():
+            filepath = os.path.join(self.theme_path, file_key)
+            if not os.path.exists(filepath) or get_file_stamp(filepath) != file_stamp:
+                return False
+            
+        for (dir_key, filenames) in self.source_dirs.items():
+            dirpath = os.path.join(self.theme_path, dir_key)
+            if not os.path.isdir(dirpath) or sorted(os.listdir(dirpath)) != filenames:
+                return False
+            
+        return True
+        
+    def close(self):
+        '''Close memory map of bundle, images will read from theme directory after close.'''
+        if self.image_map != None:
+            self.image_map.close()
+            self.image_map = None
+            
+    def get_theme_info(self):
+        '''Get parsed theme info.'''
+        return self.theme_info
+    
+    def get_image_key(self, filepath):
+        '''Get relative path of image in bundle, return None if image not in bundle.'''
+        prefix = self.theme_path + os.sep
+        if filepath != None and filepath.startswith(prefix):
+            image_key = filepath[len(prefix)::]
+            if self.image_index.has_key(image_key):
+                return image_key
+            
+        return None    
+    
+    def has_image(self, filepath):
+        '''Whether image of theme file path in bundle.'''
+        return self.image_map != None and self.get_image_key(filepath) != None
+    
+    def get_image(self, filepath):
+        '''Get (content hash, data) of image with theme file path.'''
+        (offset, length, content_key) = self.image_index[self.get_image_key(filepath)]
+        start = self.data_offset + offset
+        return (content_key, self.image_map[start:start + length])
+    
+if __name__ == "__main__":
+    # Compile every theme under given theme directories.
+    if len(sys.argv) < 2:
+        print "Usage: %s THEME_DIR..." % (sys.argv[0])
+        sys.exit(1)
+        
+    for theme_dir in sys.argv[1::]:
+        for bundle_path in compile_theme_bundles(theme_dir):
+            print "Compile %s" % (bundle_path)
@@ -20,14 +20,64 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from collections import deque
 from contextlib import contextmanager 
 from threading import Lock
 import Queue as Q
+import gobject
 import gtk
+import itertools
 import os
+import sys
 import threading as td
 import time
 
+class ResultDeliveryQueue(object):
+    '''Result delivery queue, collect results from any thread and deliver them to callback in main loop.'''
+    
+    def __init__(self, callback, time_slice=10, batch_size=50):
+        '''Init result delivery queue, every idle callback deliver results at most time_slice milliseconds.'''
+        self.callback = callback
+        self.time_slice = time_slice
+        self.batch_size = batch_size
+        self.results = deque()  # append and popleft of deque are thread-safe
+        self.schedule_lock = Lock()
+        self.scheduled = False
+        
+    def push(self, result):
+        '''Push result, can call in any thread.'''
+        self.results.append(result)
+        
+        # Just add one idle source for many results.
+        with self.schedule_lock:
+            if not self.scheduled:
+                self.scheduled = True
+                gobject.idle_add(self.deliver)
+                
+    def deliver(self):
+        '''Deliver results to callback in batches, return True to continue in next idle if time slice run out.'''
+        start_time = time.time()
+        while len(self.results) > 0:
+            batch = []
+            while len(self.results) > 0 and len(batch) < self.batch_size:
+                batch.append(self.results.popleft())
+                
+            try:    
+                self.callback(batch)
+            except Exception, e:
+                print "ResultDeliveryQueue.deliver error: %s" % (e)
+            
+            if (time.time() - start_time) * 1000 > self.time_slice:
+                break
+            
+        # Remove idle source when all results delivered.
+        with self.schedule_lock:
+            if len(self.results) == 0:
+                self.scheduled = False
+                return False
+            else:
+                return True
+
 class MissionThreadPool(td.Thread):
     '''Mission thread pool'''
     
@@ -37,7 +87,8 @@ class MissionThreadPool(td.Thread):
                  concurrent_thread_num=5, # max concurrent thread number
                  clean_delay=0,           # clean delay (milliseconds)
                  clean_callback=None,     # clean callback
-                 exit_when_finish=False   # exit thread pool when all missions finish
+                 exit_when_finish=False,  # exit thread pool when all missions finish
+                 deliver_in_main_loop=False, # call clean callback with batch of results in main loop
                  ):    
         '''Init thread pool.'''
         # Init thread.
@@ -50,6 +101,11 @@ class MissionThreadPool(td.Thread):
         self.clean_callback = clean_callback
         self.clean_time = time.time()
         self.exit_when_finish = exit_when_finish
+        self.deliver_in_main_loop = deliver_in_main_loop
+        if self.deliver_in_main_loop and self.clean_callback != None:
+            self.result_delivery_queue = ResultDeliveryQueue(self.clean_callback)
+        else:
+            self.result_delivery_queue = None
         
         # Init list.
         self.active_mission_list = []
@@ -66,17 +122,17 @@ class MissionThreadPool(td.Thread):
         
     def loop(self):
         '''Loop.'''
-        result = self.mission_lock.get()
-        if result == self.FINISH_SIGNAL:
-            print ">>> Finish missions."
-            if self.exit_when_finish:
-                print ">>> Exit thread pool %s" % (self)
+        while True:
+            result = self.mission_lock.get()
+            if result == self.FINISH_SIGNAL:
+                print ">>> Finish missions."
+                if self.exit_when_finish:
+                    print ">>> Exit thread pool %s" % (self)
+                    break
+                else:
+                    print ">>> Wait new missions."
             else:
-                print ">>> Wait new missions."
-                self.loop()
-        else:
-            self.start_missions(result)
-            self.loop()
+                self.start_missions(result)
             
     def add_missions(self, missions):
         '''Add missions.'''
@@ -101,7 +157,7 @@ class MissionThreadPool(td.Thread):
                 
     def wake_up_wait_missions(self):
         '''Wake up waiting missions.'''
-        for mission in self.wait_mission_list:
+        for mission in self.wait_mission_list[:]:
             # Just break loop when active mission is bigger than max value.
             if len(self.active_mission_list) >= self.concurrent_thread_num:
                 break
@@ -122,7 +178,7 @@ class MissionThreadPool(td.Thread):
             yield  
         except Exception, e:  
             print 'sync error %s' % e  
-        else:  
+        finally:  
             self.thread_sync_lock.release()
         
     def finish_mission(self, mission):
@@ -130,14 +186,17 @@ class MissionThreadPool(td.Thread):
         with self.sync():
             # Remove mission from active mission list.
             if mission in self.active_mission_list:
-                self.mission_result_list.append(mission.get_mission_result())
+                if self.result_delivery_queue != None:
+                    self.result_delivery_queue.push(mission.get_mission_result())
+                else:
+                    self.mission_result_list.append(mission.get_mission_result())
                 self.active_mission_list.remove(mission)
                 
             # Wake up wait missions.
             self.wake_up_wait_missions()
             
             # Do clean work.
-            if self.clean_delay > 0 and self.clean_callback != None and len(self.mission_result_list) > 0:
+            if self.result_delivery_queue == None and self.clean_delay > 0 and self.clean_callback != None and len(self.mission_result_list) > 0:
                 # Get current time.
                 current_time = time.time()
                 
@@ -181,6 +240,127 @@ class MissionThread(td.Thread):
         '''Get mission result, if you don't want handle result, just return None.'''
         return None
         
+def run_mission(mission):
+    '''Run mission in current thread, mission is MissionThread or callable object, return mission result.'''
+    if isinstance(mission, MissionThread):
+        mission.start_mission()
+        return mission.get_mission_result()
+    else:
+        return mission()
+
+class MissionFuture(object):
+    '''Future of mission in MissionWorkerPool.'''
+    
+    STATE_PENDING = 0
+    STATE_RUNNING = 1
+    STATE_FINISHED = 2
+    STATE_CANCELLED = 3
+    
+    def __init__(self, mission, callback=None):
+        '''Init mission future, callback(future) is called when mission finish.'''
+        self.mission = mission
+        self.callback = callback
+        self.state = self.STATE_PENDING
+        self.result = None
+        self.error = None
+        self.state_lock = Lock()
+        self.done_event = td.Event()
+        
+    def cancel(self):
+        '''Cancel mission, return False if mission is running or finished.'''
+        with self.state_lock:
+            if self.state != self.STATE_PENDING:
+                return False
+            self.state = self.STATE_CANCELLED
+            
+        self.done_event.set()
+        return True
+    
+    def is_cancelled(self):
+        '''Is mission cancelled.'''
+        return self.state == self.STATE_CANCELLED
+    
+    def is_done(self):
+        '''Is mission finished or cancelled.'''
+        return self.done_event.isSet()
+    
+    def get_result(self, timeout=None):
+        '''Wait mission finish and get result, return None if mission cancelled, failed or timeout.'''
+        self.done_event.wait(timeout)
+        return self.result
+    
+    def get_error(self):
+        '''Get exception raised by mission.'''
+        return self.error
+    
+    def run(self):
+        '''Run mission, call in worker thread.'''
+        with self.state_lock:
+            if self.state != self.STATE_PENDING:
+                return
+            self.state = self.STATE_RUNNING
+            
+        try:
+            self.result = run_mission(self.mission)
+        except Exception, e:
+            print "MissionFuture.run error: %s" % (e)
+            self.error = e
+            
+        self.state = self.STATE_FINISHED
+        self.done_event.set()
+        
+        if self.callback != None:
+            try:
+                self.callback(self)
+            except Exception, e:
+                print "MissionFuture.callback error: %s" % (e)
+
+class MissionWorkerPool(object):
+    '''Mission pool run missions with fixed reusable worker threads and bounded priority queue.'''
+    
+    def __init__(self, worker_num=5, max_queue_size=1000):
+        '''Init mission worker pool, add_mission block when queue have max_queue_size missions.'''
+        self.queue = Q.PriorityQueue(max_queue_size)
+        self.sequence = itertools.count() # keep order of missions with same priority
+        self.workers = []
+        
+        for _ in range(worker_num):
+            worker = td.Thread(target=self.work)
+            worker.setDaemon(True) # make thread exit when main program exit 
+            worker.start()
+            self.workers.append(worker)
+            
+    def add_mission(self, mission, priority=0, callback=None, block=True, timeout=None):
+        '''Add mission, mission with smaller priority run first, raise Queue.Full if queue is full and block is False or timeout.'''
+        future = MissionFuture(mission, callback)
+        self.queue.put((priority, self.sequence.next(), future), block, timeout)
+        return future
+    
+    def add_missions(self, missions, priority=0, callback=None):
+        '''Add missions, return futures of missions.'''
+        return [self.add_mission(mission, priority, callback) for mission in missions]
+        
+    def work(self):
+        '''Worker loop, exit when got stop signal.'''
+        while True:
+            (_, _, future) = self.queue.get()
+            try:
+                if future == None:
+                    break
+                future.run()
+            finally:
+                self.queue.task_done()
+                
+    def wait(self):
+        '''Wait all missions in queue finish.'''
+        self.queue.join()
+        
+    def stop(self):
+        '''Stop workers after missions in queue finish.'''
+        for _ in self.workers:
+            self.queue.put((sys.maxint, self.sequence.next(), None))
+        self.workers = []    
+        
 class TestMissionThread(MissionThread):
     '''Test mission thread.'''
 	
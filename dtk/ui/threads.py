@@ -20,16 +20,110 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from collections import deque
+import gobject
 import gtk
 import threading as td
+import time
 
 def post_gui(func):
     '''Post GUI code in main thread.'''
     def wrap(*a, **kw):
         gtk.gdk.threads_enter()
-        ret = func(*a, **kw)
-        gtk.gdk.threads_leave()
-        return ret
+        try:
+            return func(*a, **kw)
+        finally:
+            gtk.gdk.threads_leave()
+    return wrap
+
+class MainLoopDispatcher(object):
+    '''Main loop dispatcher, marshal calls from any thread to main loop through one idle source.'''
+    
+    def __init__(self, time_slice=10):
+        '''Init main loop dispatcher, every idle callback run calls at most time_slice milliseconds.'''
+        self.time_slice = time_slice
+        self.lock = td.Lock()
+        self.queue = deque()   # item is [key, func, args, kwargs, enqueue_time]
+        self.key_dict = {}
+        self.scheduled = False
+        
+        self.reset_metrics()
+        
+    def dispatch(self, func, *args, **kwargs):
+        '''Dispatch call to main loop.'''
+        self.dispatch_with_key(None, func, *args, **kwargs)
+        
+    def dispatch_with_key(self, key, func, *args, **kwargs):
+        '''Dispatch call to main loop, if call with same key is waiting, just replace it with latest one.'''
+        with self.lock:
+            if key != None and self.key_dict.has_key(key):
+                # Keep position and enqueue time of waiting call.
+                self.key_dict[key][1:4] = [func, args, kwargs]
+            else:
+                call = [key, func, args, kwargs, time.time()]
+                self.queue.append(call)
+                if key != None:
+                    self.key_dict[key] = call
+                self.max_queue_depth = max(self.max_queue_depth, len(self.queue))
+                    
+            # Just add one idle source for all calls.
+            if not self.scheduled:
+                self.scheduled = True
+                gobject.idle_add(self.dispatch_calls)
+                
+    def dispatch_calls(self):
+        '''Run waiting calls in main loop, return True to continue in next idle if time slice run out.'''
+        start_time = time.time()
+        while True:
+            with self.lock:
+                if len(self.queue) == 0:
+                    self.scheduled = False
+                    return False
+                
+                (key, func, args, kwargs, enqueue_time) = self.queue.popleft()
+                if key != None:
+                    del self.key_dict[key]
+                    
+            # Update metrics.
+            latency = time.time() - enqueue_time
+            self.dispatch_count += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            
+            try:
+                func(*args, **kwargs)
+            except Exception, e:
+                print "MainLoopDispatcher.dispatch_calls error: %s" % (e)
+                
+            if (time.time() - start_time) * 1000 > self.time_slice:
+                return True
+            
+    def get_metrics(self):
+        '''Get metrics of dispatcher, latency is in milliseconds.'''
+        if self.dispatch_count > 0:
+            average_latency = self.total_latency * 1000 / self.dispatch_count
+        else:
+            average_latency = 0
+            
+        return {"queue_depth" : len(self.queue),
+                "max_queue_depth" : self.max_queue_depth,
+                "dispatch_count" : self.dispatch_count,
+                "average_latency" : average_latency,
+                "max_latency" : self.max_latency * 1000}
+    
+    def reset_metrics(self):
+        '''Reset metrics.'''
+        self.max_queue_depth = 0
+        self.dispatch_count = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+main_loop_dispatcher = MainLoopDispatcher()
+
+def post_main_loop(func):
+    '''Post call to main loop, wrapped function return immediately without hold GDK lock.'''
+    def wrap(*a, **kw):
+        main_loop_dispatcher.dispatch(func, *a, **kw)
     return wrap
 
 class AnonymityThread(td.Thread):
@@ -21,16 +21,20 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from contextlib import contextmanager 
+from lru_cache import LRUCache
 import cairo
 import gobject
 import gtk
+import hashlib
 import math
 import os
 import pango
 import pangocairo
 import socket
 import subprocess
+import threading
 import time
+import uuid
 from constant import (WIDGET_POS_TOP_LEFT, WIDGET_POS_TOP_RIGHT, 
                       WIDGET_POS_TOP_CENTER, WIDGET_POS_BOTTOM_LEFT, 
                       WIDGET_POS_BOTTOM_CENTER, WIDGET_POS_BOTTOM_RIGHT, 
@@ -280,23 +284,101 @@ def scroll_to_bottom(scrolled_window):
     vadjust = scrolled_window.get_vadjustment()
     vadjust.set_value(vadjust.get_upper() - vadjust.get_page_size())
 
+TEXT_LAYOUT_CACHE_SIZE = 2000
+text_layout_cache = LRUCache(TEXT_LAYOUT_CACHE_SIZE)
+font_description_cache = {}
+text_layout_context = None
+text_layout_ticker = 0
+text_layout_thread = threading.current_thread() # text layout cache just use in thread that import utils (main thread)
+
+def get_font_description(text_font=DEFAULT_FONT, text_size=DEFAULT_FONT_SIZE):
+    '''Get font description, font description of same font and size just create once.'''
+    key = (text_font, text_size)
+    if not font_description_cache.has_key(key):
+        font_description_cache[key] = pango.FontDescription("%s %s" % (text_font, text_size))
+        
+    return font_description_cache[key]
+
+def get_text_layout_context():
+    '''Get pangocairo context use to create text layout.'''
+    global text_layout_context
+    
+    if text_layout_context == None:
+        text_layout_context = create_text_layout_context()
+        
+        # Clear text layout cache when system font changed.
+        settings = gtk.settings_get_default()
+        if settings != None:
+            settings.connect("notify::gtk-font-name", lambda s, p: clear_text_layout_cache())
+            settings.connect("notify::gtk-xft-dpi", lambda s, p: clear_text_layout_cache())
+        
+    return text_layout_context
+    
+def create_text_layout_context():
+    '''Create pangocairo context use to create text layout.'''
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 0, 0) # don't need give size
+    return pangocairo.CairoContext(cairo.Context(surface))
+    
+def get_text_layout(markup, text_size=DEFAULT_FONT_SIZE, text_font=DEFAULT_FONT, 
+                    width=None, wrap_width=None, alignment=pango.ALIGN_LEFT):
+    '''
+    Get text layout and pixel size of layout, return (layout, (width, height)).
+    
+    Layout is cached with LRU policy in main thread, so don't modify return layout,
+    use `pangocairo.CairoContext.update_layout` before draw it on other cairo context.
+    Cached layout is shared and updated when draw, so other threads get new layout every call.
+    
+    If width is not None, text will ellipsize at end of line,
+    if wrap_width is not None, text will wrap with word.
+    '''
+    if threading.current_thread() is not text_layout_thread:
+        return create_text_layout(create_text_layout_context(), 
+                                  markup, text_size, text_font, width, wrap_width, alignment)
+    
+    key = (markup, text_font, text_size, width, wrap_width, alignment)
+    layout_info = text_layout_cache.get(key)
+    if layout_info == None:
+        layout_info = create_text_layout(get_text_layout_context(), 
+                                         markup, text_size, text_font, width, wrap_width, alignment)
+        text_layout_cache.set(key, layout_info)
+        
+    return layout_info
+
+def create_text_layout(context, markup, text_size, text_font, width, wrap_width, alignment):
+    '''Create text layout with pangocairo context, return (layout, (width, height)).'''
+    layout = context.create_layout()
+    layout.set_font_description(get_font_description(text_font, text_size))
+    layout_set_markup(layout, markup)
+    layout.set_alignment(alignment)
+    if wrap_width == None:
+        layout.set_single_paragraph_mode(True)
+        if width != None:
+            layout.set_width(int(width * pango.SCALE))
+            layout.set_ellipsize(pango.ELLIPSIZE_END)
+    else:
+        layout.set_width(int(wrap_width * pango.SCALE))
+        layout.set_single_paragraph_mode(False)
+        layout.set_wrap(pango.WRAP_WORD)
+        
+    return (layout, layout.get_pixel_size())
+
+def clear_text_layout_cache():
+    '''Clear text layout cache, call when font or theme changed.'''
+    global text_layout_ticker
+    
+    text_layout_cache.clear()
+    font_description_cache.clear()
+    text_layout_ticker += 1
+    
+def get_text_layout_ticker():
+    '''Get ticker of text layout, ticker increase when text layout cache cleared.'''
+    return text_layout_ticker
+
 def get_content_size(text, text_size=DEFAULT_FONT_SIZE, text_font=DEFAULT_FONT, wrap_width=None):
     '''Get size of text, in pixel.'''
     if text:
-        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 0, 0) # don't need give size
-        cr = cairo.Context(surface)
-        context = pangocairo.CairoContext(cr)
-        layout = context.create_layout()
-        layout.set_font_description(pango.FontDescription("%s %s" % (text_font, text_size)))
-        layout_set_markup(layout, text)
-        if wrap_width == None:
-            layout.set_single_paragraph_mode(True)
-        else:
-            layout.set_width(wrap_width * pango.SCALE)
-            layout.set_single_paragraph_mode(False)
-            layout.set_wrap(pango.WRAP_WORD)
-        
-        return layout.get_pixel_size()
+        (_, size) = get_text_layout(text, text_size, text_font, wrap_width=wrap_width)
+        return size
     else:
         return (0, 0)
     
@@ -705,10 +787,12 @@ def rgb2hsb(r_value, g_value, b_value):
     
     return (h, s, b)
 
+# HSB of similar colors, just compute once.
+similar_color_hsb_list = map(lambda name: (name, rgb2hsb(*color_hex_to_cairo(COLOR_NAME_DICT[name]))), SIMILAR_COLOR_SEQUENCE)
+
 def find_similar_color(search_color):
     '''Find simliar color match search_color, detail look hsb(hsv).png in current directory.'''
     (search_h, search_s, search_b) = rgb2hsb(*color_hex_to_cairo(search_color))
-    hsb_colors = map(lambda name: (name, rgb2hsb(*color_hex_to_cairo(COLOR_NAME_DICT[name]))), SIMILAR_COLOR_SEQUENCE)
     
     # Debug.
     # print (search_h, search_s, search_b)
@@ -724,7 +808,7 @@ def find_similar_color(search_color):
     # Otherwise find nearest color in hsb color space.
     else:
         min_color_distance = None
-        for (color_name, (h, s, b)) in hsb_colors:
+        for (color_name, (h, s, b)) in similar_color_hsb_list:
             color_distance = abs(h - search_h)
             if min_color_distance == None or color_distance < min_color_distance:
                 min_color_distance = color_distance
@@ -844,9 +928,115 @@ def layout_set_markup(layout, markup):
     else:
         layout.set_markup(markup)
 
+OPTIMUM_PIXBUF_CACHE_DIR = os.path.expanduser("~/.cache/deepin-ui/optimum_pixbuf")
+OPTIMUM_PIXBUF_CACHE_SIZE = 16 * 1024 * 1024 # bytes
+OPTIMUM_PIXBUF_CACHE_FILE_NUM = 500           # max file number of disk cache
+OPTIMUM_PIXBUF_CACHE_CLEAN_INTERVAL = 50      # clean disk cache after save some files
+optimum_pixbuf_cache = LRUCache(OPTIMUM_PIXBUF_CACHE_SIZE)
+optimum_pixbuf_cache_lock = threading.Lock() # function call in worker threads too
+optimum_pixbuf_save_count = 0
+
 def get_optimum_pixbuf_from_file(filepath, expect_width, expect_height, cut_middle_area=True):
-    '''Get optimum pixbuf from file.'''
-    pixbuf = gtk.gdk.pixbuf_new_from_file(filepath)
+    '''
+    Get optimum pixbuf from file, result cache in memory and disk with path, mtime and expect size.
+    
+    Return new copy of cached pixbuf, caller can modify it without change cache.
+    '''
+    global optimum_pixbuf_save_count
+    
+    # Decode file directly when can't stat file, it raise glib.GError same as decode without cache.
+    try:
+        file_stat = os.stat(filepath)
+    except OSError:
+        return get_optimum_pixbuf(
+            get_pixbuf_at_scale(filepath, expect_width, expect_height),
+            expect_width, expect_height, cut_middle_area)
+    
+    # Get pixbuf from memory cache.
+    cache_key = "%s:%s:%s:%sx%s:%s" % (filepath, file_stat.st_mtime, file_stat.st_size, 
+                                       expect_width, expect_height, cut_middle_area)
+    with optimum_pixbuf_cache_lock:
+        pixbuf = optimum_pixbuf_cache.get(cache_key)
+    if pixbuf != None:
+        return pixbuf.copy()
+    
+    # Get pixbuf from disk cache.
+    cache_path = os.path.join(OPTIMUM_PIXBUF_CACHE_DIR, "%s.png" % hashlib.md5(cache_key).hexdigest())
+    if os.path.exists(cache_path):
+        try:
+            pixbuf = gtk.gdk.pixbuf_new_from_file(cache_path)
+            
+            # Update mtime of cache file, clean_optimum_pixbuf_cache remove least recently used files.
+            os.utime(cache_path, None)
+        except gobject.GError:
+            remove_file(cache_path)
+        except OSError:
+            pass
+            
+    if pixbuf == None:
+        pixbuf = get_optimum_pixbuf(
+            get_pixbuf_at_scale(filepath, expect_width, expect_height),
+            expect_width, expect_height, cut_middle_area)
+        
+        # Save pixbuf to disk cache, write temp file first to make sure cache file is complete.
+        temp_path = None
+        try:
+            create_directory(OPTIMUM_PIXBUF_CACHE_DIR)
+            temp_path = "%s.%s" % (cache_path, uuid.uuid4())
+            pixbuf.save(temp_path, "png")
+            os.rename(temp_path, cache_path)
+        except Exception, e:
+            print "get_optimum_pixbuf_from_file error: %s" % (e)
+            
+            if temp_path != None:
+                try:
+                    remove_file(temp_path)
+                except OSError:
+                    pass
+        else:
+            # Clean disk cache when first save and every some saves.
+            with optimum_pixbuf_cache_lock:
+                need_clean = optimum_pixbuf_save_count % OPTIMUM_PIXBUF_CACHE_CLEAN_INTERVAL == 0
+                optimum_pixbuf_save_count += 1
+            if need_clean:
+                clean_optimum_pixbuf_cache()
+            
+    with optimum_pixbuf_cache_lock:
+        optimum_pixbuf_cache.set(cache_key, pixbuf, pixbuf.get_rowstride() * pixbuf.get_height())
+        
+    return pixbuf.copy()
+
+def clean_optimum_pixbuf_cache(max_file_num=OPTIMUM_PIXBUF_CACHE_FILE_NUM):
+    '''Remove least recently used files of optimum pixbuf disk cache, just keep max_file_num files.'''
+    try:
+        cache_files = []
+        for filename in os.listdir(OPTIMUM_PIXBUF_CACHE_DIR):
+            cache_path = os.path.join(OPTIMUM_PIXBUF_CACHE_DIR, filename)
+            cache_files.append((os.path.getmtime(cache_path), cache_path))
+            
+        cache_files.sort()
+        for (_, cache_path) in cache_files[0:max(len(cache_files) - max_file_num, 0)]:
+            remove_file(cache_path)
+    except OSError, e:
+        print "clean_optimum_pixbuf_cache error: %s" % (e)
+    
+def get_pixbuf_at_scale(filepath, expect_width, expect_height):
+    '''Get pixbuf just cover expect size from file, avoid decode full size of big image.'''
+    file_info = gtk.gdk.pixbuf_get_file_info(filepath)
+    if file_info != None:
+        (_, image_width, image_height) = file_info
+        scale = max(float(expect_width) / image_width, float(expect_height) / image_height)
+        if scale < 1.0:
+            return gtk.gdk.pixbuf_new_from_file_at_scale(
+                filepath, 
+                int(math.ceil(image_width * scale)), 
+                int(math.ceil(image_height * scale)), 
+                False)
+        
+    return gtk.gdk.pixbuf_new_from_file(filepath)
+
+def get_optimum_pixbuf(pixbuf, expect_width, expect_height, cut_middle_area=True):
+    '''Get optimum pixbuf, scale pixbuf to cover expect size and cut it.'''
     pixbuf_width, pixbuf_height = pixbuf.get_width(), pixbuf.get_height()
     if pixbuf_width >= expect_width and pixbuf_height >= expect_height:
         if float(pixbuf_width) / pixbuf_height == float(expect_width) / expect_height:
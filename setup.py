@@ -1,6 +1,7 @@
 #! /usr/bin/env python
 
 from setuptools import setup, Extension
+from setuptools.command.build_py import build_py
 import os
 import commands
 
@@ -29,6 +30,26 @@ webkit_mod = Extension('dtk_webkit_cookie',
                 libraries = ['webkitgtk-1.0', 'soup-2.4', 'pthread', 'glib-2.0'],
                 sources = ['./dtk/ui/webkit_cookie.c'])
 
+class build_py_theme_bundle(build_py):
+    '''Build python modules, and compile theme bundles of dtk/theme in build directory.'''
+    
+    def run(self):
+        '''Run.'''
+        # Import when build, theme_bundle just depend on standard library.
+        from dtk.ui.theme_bundle import compile_theme_bundle, THEME_BUNDLE_FILE
+        
+        build_py.run(self)
+        
+        # Bundles install with theme files, don't write bundles in source tree.
+        bundle_dir = os.path.join(self.get_finalized_command("build").build_base, "theme_bundle")
+        for theme_name in sorted(os.listdir("dtk/theme")):
+            theme_path = os.path.join("dtk/theme", theme_name)
+            if os.path.exists(os.path.join(theme_path, "theme.txt")):
+                bundle_path = os.path.join(bundle_dir, theme_name, THEME_BUNDLE_FILE)
+                self.mkpath(os.path.dirname(bundle_path))
+                compile_theme_bundle(theme_path, bundle_path)
+                self.distribution.data_files.append((theme_path, [bundle_path]))
+        
 setup(name='dtk',
       version='0.1',
       ext_modules = [cairo_mod, webkit_mod],
@@ -42,5 +63,6 @@ setup(name='dtk',
       platforms = ['Linux'],
       packages = ['dtk', 'dtk.ui'],
       data_files = list_files("dtk/theme","dtk/theme") + list_files("dtk/locale", "dtk/locale"),
+      cmdclass = {"build_py" : build_py_theme_bundle},
       )
 